@@ -0,0 +1,159 @@
+"""
+列式数据响应格式
+直接按列从DataManager的数据框编码，不构造逐行的Python字典与Pydantic对象：
+- Arrow IPC流 (application/vnd.apache.arrow.stream，需要pyarrow)
+- 列式JSON (application/vnd.columnar+json，每列一个数组)
+- 压缩二进制 (application/x-npz，NumPy npz格式，zlib压缩)
+"""
+import importlib.util
+import io
+import json
+from functools import partial
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON = "application/vnd.columnar+json"
+NUMPY_NPZ = "application/x-npz"
+
+# 选择默认逐行JSON的媒体类型
+_DEFAULT_TYPES = ("application/json", "application/*", "*/*")
+
+_dumps = partial(json.dumps, ensure_ascii=False, separators=(',', ':'))
+
+
+class UnsupportedFormatError(ValueError):
+    """请求的响应格式均不可用"""
+
+
+def arrow_available() -> bool:
+    """pyarrow是否已安装"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _column_names(df: pd.DataFrame, rename: Optional[Dict[str, str]]) -> list:
+    rename = rename or {}
+    return [rename.get(col, col) for col in df.columns]
+
+
+def _date_strings(df: pd.DataFrame) -> np.ndarray:
+    """日期索引转YYYY-MM-DD字符串（向量化）"""
+    return np.datetime_as_string(df.index.values.astype('datetime64[D]'), unit='D')
+
+
+def encode_arrow(df: pd.DataFrame, rename: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    编码为Arrow IPC流
+    
+    数值列直接引用NumPy缓冲区，NaN记为空值
+    """
+    import pyarrow as pa
+    
+    arrays = [pa.array(df.index.values.astype('datetime64[D]'))]
+    arrays += [pa.array(df[col].to_numpy(), from_pandas=True) for col in df.columns]
+    table = pa.Table.from_arrays(arrays, names=['date'] + _column_names(df, rename))
+    
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _json_array(values: np.ndarray) -> str:
+    """一列编码为JSON数组，NaN/±inf记为null"""
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all():
+            values = np.where(np.isfinite(values), values, np.nan)
+        # json.dumps对浮点列表走C实现，NaN以字面量NaN输出后统一替换
+        return _dumps(values.tolist()).replace('NaN', 'null')
+    if values.dtype.kind in 'iub':
+        return _dumps(values.tolist())
+    return _dumps(pd.Series(values).astype(object).where(pd.notna(values), None).tolist())
+
+
+def encode_columnar_json(df: pd.DataFrame, rename: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    编码为列式JSON: {"columns": [...], "n_rows": n, "data": {"date": [...], 列名: [...]}}
+    """
+    names = ['date'] + _column_names(df, rename)
+    parts = [_dumps('date') + ':' + _dumps(_date_strings(df).tolist())]
+    for name, col in zip(names[1:], df.columns):
+        parts.append(_dumps(name) + ':' + _json_array(df[col].to_numpy()))
+    
+    body = ('{"columns":' + _dumps(names)
+            + ',"n_rows":' + str(len(df))
+            + ',"data":{' + ','.join(parts) + '}}')
+    return body.encode('utf-8')
+
+
+def encode_npz(df: pd.DataFrame, rename: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    编码为压缩的NumPy npz（每列一个数组，日期为datetime64[D]）
+    
+    文本列转为定长字符串数组，客户端可用np.load(allow_pickle=False)读取
+    """
+    arrays = {'date': df.index.values.astype('datetime64[D]')}
+    for name, col in zip(_column_names(df, rename), df.columns):
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            values = np.where(pd.notna(values), values, '').astype(str)
+        arrays[name] = values
+    
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+ENCODERS: Dict[str, Callable[..., bytes]] = {
+    ARROW_STREAM: encode_arrow,
+    COLUMNAR_JSON: encode_columnar_json,
+    NUMPY_NPZ: encode_npz
+}
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    按Accept头（含q值）选择列式格式
+    
+    Returns:
+        选中的媒体类型；None表示使用默认的逐行JSON
+        （未携带Accept、接受JSON/通配符，或未列出任何已知格式时）
+    
+    Raises:
+        UnsupportedFormatError: 只请求了Arrow但pyarrow未安装
+    """
+    if not accept:
+        return None
+    
+    candidates = []
+    for order, item in enumerate(accept.split(',')):
+        media_type, _, params = item.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidates.append((-q, order, media_type.strip().lower()))
+    
+    arrow_requested = False
+    for _, _, media_type in sorted(candidates):
+        if media_type == ARROW_STREAM and not arrow_available():
+            arrow_requested = True
+            continue
+        if media_type in ENCODERS:
+            return media_type
+        if media_type in _DEFAULT_TYPES:
+            return None
+    
+    if arrow_requested:
+        raise UnsupportedFormatError(
+            f"pyarrow未安装，无法返回{ARROW_STREAM}；"
+            f"可用格式: application/json, {COLUMNAR_JSON}, {NUMPY_NPZ}"
+        )
+    return None
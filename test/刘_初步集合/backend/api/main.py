@@ -5,11 +5,12 @@
 import os
 import sys
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Dict, Optional, Any, Callable, Hashable
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
@@ -19,6 +20,10 @@ import yaml
 # 导入自定义模块
 from backend.core.prediction_engine import PredictionEngine
 from backend.core.data_manager import DataManager
+from backend.core.inference_executor import InferenceExecutor, ExecutorOverloadedError
+from backend.api.request_coalescer import PredictionCoalescer
+from backend.api.response_cache import ResponseCache
+from backend.api import columnar
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 # 加载配置
@@ -45,6 +50,9 @@ app.add_middleware(
 app_state = {
     "prediction_engine": None,
     "data_manager": None,
+    "executor": None,
+    "coalescer": None,
+    "response_cache": None,
     "initialized": False,
     "last_update": None
 }
@@ -69,6 +77,11 @@ class MonthlyIndicator(BaseModel):
     ppi: Optional[float] = None
 
 
+class MonthlyRelease(BaseModel):
+    date: str
+    values: Dict[str, Optional[float]]
+
+
 class PredictionRequest(BaseModel):
     target: str = Field(default="gdp", description="预测目标")
     horizon: int = Field(default=1, ge=1, le=4, description="预测期数")
@@ -81,7 +94,7 @@ class PredictionResponse(BaseModel):
     linear_prediction: float
     nonlinear_correction: float
     final_prediction: float
-    confidence_interval: Optional[Dict[str, float]] = None
+    confidence_interval: Optional[Dict[str, float]] = None  # level/lower/upper
     model_weights: Dict[str, float]
 
 
@@ -114,6 +127,21 @@ async def startup_event():
     """应用启动时初始化"""
     print("🚀 正在初始化宏观经济预测系统...")
     
+    # 阻塞的模型计算统一交给有界线程池，事件循环只负责调度
+    app_state["executor"] = InferenceExecutor(
+        max_workers=config['backend'].get('inference_workers', 4),
+        max_queue=config['backend'].get('inference_queue_depth', 32)
+    )
+    # 并发预测请求按(目标, 是否混合)合并，每组只占用一个执行器任务
+    app_state["coalescer"] = PredictionCoalescer(
+        run_predict_batch,
+        window_ms=config['backend'].get('predict_coalesce_window_ms', 5),
+        max_batch=config['backend'].get('predict_max_batch', 64)
+    )
+    app_state["response_cache"] = ResponseCache(
+        max_entries=config['backend'].get('response_cache_entries', 256)
+    )
+    
     try:
         # 初始化数据管理器
         app_state["data_manager"] = DataManager()
@@ -137,6 +165,112 @@ async def shutdown_event():
     """应用关闭时清理资源"""
     print("👋 正在关闭宏观经济预测系统...")
     app_state["initialized"] = False
+    if app_state["executor"]:
+        app_state["executor"].shutdown(wait=False)
+
+
+# ============ 阻塞调用 ============
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    在有界执行器中运行阻塞的引擎/数据调用，排队已满时返回503
+    """
+    try:
+        return await app_state["executor"].run(fn, *args, **kwargs)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+async def run_predict_batch(target: str, horizons: List[int], use_hybrid: bool):
+    """合并后的批量预测：一次执行器任务计算该组的全部预测期"""
+    return await run_blocking(
+        app_state["prediction_engine"].predict_batch,
+        target=target,
+        horizons=horizons,
+        use_hybrid=use_hybrid
+    )
+
+
+# ============ 响应缓存 ============
+
+# DataManager的GDP列名与GDPData字段的对应关系
+GDP_COLUMNS = {'gdp_value': 'value', 'gdp_yoy': 'yoy_growth'}
+
+
+def _frame_records(df: pd.DataFrame, rename: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """DataFrame转记录列表（NaN转为None，便于JSON序列化）"""
+    if rename:
+        df = df.rename(columns=rename)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _render_json(payload: Any, model: Any = None) -> bytes:
+    """按响应模型校验并序列化，与FastAPI默认的JSON输出一致"""
+    if model is not None:
+        adapter = TypeAdapter(model)
+        return adapter.dump_json(adapter.validate_python(payload))
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+async def cached_response(request: Request, version: Hashable, render: Callable[[], bytes],
+                          media_type: str = "application/json", vary: Optional[str] = None) -> Response:
+    """
+    只读接口的版本化缓存响应
+    
+    以(路径, 查询参数, 版本)查找已序列化的响应体，未命中时在执行器中调用render生成；
+    请求携带的If-None-Match与ETag一致时返回不带响应体的304
+    """
+    cache = app_state["response_cache"]
+    key = cache.make_key(request.url.path, request.query_params.multi_items(), version)
+    entry = cache.get(key)
+    if entry is None:
+        body = await run_blocking(render)
+        entry = cache.put(key, body, media_type)
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if vary:
+        headers["Vary"] = vary
+    if cache.etag_matches(request.headers.get("if-none-match"), entry.etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+async def cached_json_response(request: Request, version: Hashable,
+                               build: Callable[[], Any], model: Any = None) -> Response:
+    """按响应模型序列化的版本化缓存JSON响应"""
+    return await cached_response(request, version, lambda: _render_json(build(), model))
+
+
+async def data_response(request: Request, dataset: str, records: Callable[[], List[Dict[str, Any]]],
+                        model: Any = None, indicator: Optional[str] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        rename: Optional[Dict[str, str]] = None) -> Response:
+    """
+    数据查询接口的响应：按Accept头选择逐行JSON或列式格式
+    
+    列式格式（Arrow IPC、列式JSON、npz）直接从DataManager的数据框按列编码，
+    格式是缓存版本的一部分，ETag随格式不同而不同
+    """
+    try:
+        media_type = columnar.negotiate(request.headers.get("accept"))
+    except columnar.UnsupportedFormatError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    data_manager = app_state["data_manager"]
+    if media_type is None:
+        return await cached_response(
+            request, (data_manager.data_version, "application/json"),
+            lambda: _render_json(records(), model), vary="Accept"
+        )
+    
+    encode = columnar.ENCODERS[media_type]
+    return await cached_response(
+        request, (data_manager.data_version, media_type),
+        lambda: encode(data_manager.get_frame(dataset, indicator, start_date, end_date), rename),
+        media_type=media_type, vary="Accept"
+    )
 
 
 # ============ API路由 ============
@@ -158,7 +292,10 @@ async def health_check():
     return {
         "status": "healthy" if app_state["initialized"] else "degraded",
         "initialized": app_state["initialized"],
-        "last_update": app_state["last_update"]
+        "last_update": app_state["last_update"],
+        "inference": app_state["executor"].stats() if app_state["executor"] else None,
+        "predict_coalescing": app_state["coalescer"].stats() if app_state["coalescer"] else None,
+        "response_cache": app_state["response_cache"].stats() if app_state["response_cache"] else None
     }
 
 
@@ -166,37 +303,106 @@ async def health_check():
 
 @app.get("/api/v1/data/gdp", response_model=List[GDPData])
 async def get_gdp_data(
+    request: Request,
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)")
 ):
     """
     获取GDP历史数据
+    
+    Accept为application/vnd.apache.arrow.stream、application/vnd.columnar+json
+    或application/x-npz时返回对应的列式格式
     """
     try:
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        data = app_state["data_manager"].get_gdp_data(start_date, end_date)
-        return data.to_dict('records')
+        data_manager = app_state["data_manager"]
+        return await data_response(
+            request, 'gdp',
+            lambda: _frame_records(data_manager.get_gdp_data(start_date, end_date), GDP_COLUMNS),
+            List[GDPData], start_date=start_date, end_date=end_date, rename=GDP_COLUMNS
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/v1/data/monthly", response_model=List[MonthlyIndicator])
 async def get_monthly_data(
+    request: Request,
     indicator: Optional[str] = Query(None, description="特定指标名称"),
     start_date: Optional[str] = Query(None, description="开始日期"),
     end_date: Optional[str] = Query(None, description="结束日期")
 ):
     """
-    获取月度指标数据
+    获取月度指标数据（支持与GDP接口相同的列式格式）
     """
     try:
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        data = app_state["data_manager"].get_monthly_data(indicator, start_date, end_date)
-        return data.to_dict('records')
+        data_manager = app_state["data_manager"]
+        return await data_response(
+            request, 'monthly',
+            lambda: _frame_records(data_manager.get_monthly_data(indicator, start_date, end_date)),
+            List[MonthlyIndicator], indicator, start_date, end_date
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/v1/data/monthly")
+async def post_monthly_release(releases: List[MonthlyRelease]):
+    """
+    新月度数据发布：增量更新DFM模型（无需重训练），未提供的指标按缺失处理
+    """
+    try:
+        if not app_state["initialized"]:
+            raise HTTPException(status_code=503, detail="系统尚未初始化")
+        
+        new_monthly = pd.DataFrame(
+            [release.values for release in releases],
+            index=pd.to_datetime([release.date for release in releases]),
+            dtype=float
+        )
+        try:
+            result = await run_blocking(app_state["prediction_engine"].update_dfm, new_monthly)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        app_state["last_update"] = datetime.now().isoformat()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/v1/data/daily")
+async def get_daily_data(
+    request: Request,
+    indicator: Optional[str] = Query(None, description="特定指标名称"),
+    start_date: Optional[str] = Query(None, description="开始日期"),
+    end_date: Optional[str] = Query(None, description="结束日期")
+):
+    """
+    获取日度金融数据（数据量大，建议使用列式格式）
+    """
+    try:
+        if not app_state["initialized"]:
+            raise HTTPException(status_code=503, detail="系统尚未初始化")
+        
+        data_manager = app_state["data_manager"]
+        return await data_response(
+            request, 'daily',
+            lambda: _frame_records(data_manager.get_daily_data(indicator, start_date, end_date)),
+            None, indicator, start_date, end_date
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -210,7 +416,9 @@ async def get_latest_data():
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["data_manager"].get_latest_snapshot()
+        return await run_blocking(app_state["data_manager"].get_latest_snapshot)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -226,21 +434,22 @@ async def predict(request: PredictionRequest):
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        result = app_state["prediction_engine"].predict(
-            target=request.target,
-            horizon=request.horizon,
-            use_hybrid=request.use_hybrid
+        result = await app_state["coalescer"].submit(
+            request.target, request.horizon, request.use_hybrid
         )
         
         return PredictionResponse(
             target=request.target,
             prediction_date=datetime.now().isoformat(),
-            linear_prediction=result['linear_prediction'],
-            nonlinear_correction=result['nonlinear_correction'],
-            final_prediction=result['final_prediction'],
+            # 多期预测时返回最后一期，与confidence_interval对应
+            linear_prediction=float(np.atleast_1d(result['linear_prediction'])[-1]),
+            nonlinear_correction=float(np.atleast_1d(result['nonlinear_correction'])[-1]),
+            final_prediction=float(np.atleast_1d(result['final_prediction'])[-1]),
             confidence_interval=result.get('confidence_interval'),
             model_weights=result['model_weights']
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -254,7 +463,7 @@ async def nowcast(target: str = Query(default="gdp", description="预测目标")
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        result = app_state["prediction_engine"].nowcast(target=target)
+        result = await run_blocking(app_state["prediction_engine"].nowcast, target=target)
         
         return NowcastResponse(
             target=target,
@@ -264,6 +473,8 @@ async def nowcast(target: str = Query(default="gdp", description="预测目标")
             final_nowcast=result['final_nowcast'],
             data_availability=result['data_availability']
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -280,7 +491,9 @@ async def get_prediction_history(
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["prediction_engine"].get_prediction_history(target, n_periods)
+        return await run_blocking(app_state["prediction_engine"].get_prediction_history, target, n_periods)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -288,7 +501,7 @@ async def get_prediction_history(
 # ============ 模型管理API ============
 
 @app.get("/api/v1/model/status", response_model=ModelStatus)
-async def get_model_status():
+async def get_model_status(request: Request):
     """
     获取模型状态
     """
@@ -299,7 +512,10 @@ async def get_model_status():
                 models_loaded={"midas": False, "dfm": False, "tslm": False}
             )
         
-        return app_state["prediction_engine"].get_status()
+        engine = app_state["prediction_engine"]
+        return await cached_json_response(request, engine.model_version, engine.get_status, ModelStatus)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -312,6 +528,8 @@ async def retrain_models(background_tasks: BackgroundTasks):
     try:
         background_tasks.add_task(_retrain_models_task)
         return {"message": "模型重训练任务已启动", "status": "processing"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -321,7 +539,7 @@ async def _retrain_models_task():
     try:
         print("🔄 后台任务: 重新训练模型...")
         if app_state["prediction_engine"]:
-            app_state["prediction_engine"].retrain()
+            await app_state["executor"].run(app_state["prediction_engine"].retrain)
             app_state["last_update"] = datetime.now().isoformat()
         print("✅ 模型重训练完成")
     except Exception as e:
@@ -340,7 +558,9 @@ async def get_model_performance(
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["prediction_engine"].get_performance_metrics(target, metric)
+        return await run_blocking(app_state["prediction_engine"].get_performance_metrics, target, metric)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -348,7 +568,7 @@ async def get_model_performance(
 # ============ 因子分析API ============
 
 @app.get("/api/v1/analysis/factors")
-async def get_factor_analysis():
+async def get_factor_analysis(request: Request):
     """
     获取DFM因子分析结果
     """
@@ -356,7 +576,28 @@ async def get_factor_analysis():
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["prediction_engine"].get_factor_analysis()
+        engine = app_state["prediction_engine"]
+        return await cached_json_response(request, engine.model_version, engine.get_factor_analysis)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/v1/analysis/dfm-forecast")
+async def get_dfm_forecast(
+    horizon: int = Query(default=4, ge=1, le=24, description="预测期数")
+):
+    """
+    获取DFM全部指标的多步预测与预测区间（扇形图）
+    """
+    try:
+        if not app_state["initialized"]:
+            raise HTTPException(status_code=503, detail="系统尚未初始化")
+        
+        return await run_blocking(app_state["prediction_engine"].forecast_dfm, horizon)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -373,13 +614,15 @@ async def get_prediction_attribution(
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["prediction_engine"].get_attribution(target, date)
+        return await run_blocking(app_state["prediction_engine"].get_attribution, target, date)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/v1/analysis/midas-weights")
-async def get_midas_weights():
+async def get_midas_weights(request: Request):
     """
     获取MIDAS模型滞后权重
     """
@@ -387,7 +630,10 @@ async def get_midas_weights():
         if not app_state["initialized"]:
             raise HTTPException(status_code=503, detail="系统尚未初始化")
         
-        return app_state["prediction_engine"].get_midas_weights()
+        engine = app_state["prediction_engine"]
+        return await cached_json_response(request, engine.model_version, engine.get_midas_weights)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -405,10 +651,12 @@ async def get_summary_report():
         
         return {
             "generated_at": datetime.now().isoformat(),
-            "latest_nowcast": await nowcast(),
-            "model_status": await get_model_status(),
-            "latest_data": app_state["data_manager"].get_latest_snapshot()
+            "latest_nowcast": await nowcast(target="gdp"),
+            "model_status": await run_blocking(app_state["prediction_engine"].get_status),
+            "latest_data": await run_blocking(app_state["data_manager"].get_latest_snapshot)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -421,6 +669,8 @@ async def generate_report(background_tasks: BackgroundTasks):
     try:
         background_tasks.add_task(_generate_report_task)
         return {"message": "报告生成任务已启动", "status": "processing"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,111 @@
+"""
+预测请求合并器
+在短时间窗口内收集/api/v1/predict请求，按(目标, 是否混合)分组，
+每组只向预测引擎提交一次批量调用（按最大预测期计算一次，相同预测期共享结果），
+再把各请求的结果分发回去
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# 批量预测函数: (target, 各请求的horizon, use_hybrid) -> 与horizons一一对应的结果
+BatchPredictFn = Callable[[str, List[int], bool], Awaitable[List[Dict[str, Any]]]]
+
+
+class PredictionCoalescer:
+    """
+    预测请求合并器
+    
+    只在事件循环线程中使用：分组状态无需加锁。
+    批量调用由batch_fn完成（API中经有界执行器执行），
+    其异常（包括执行器过载对应的503）会传递给该批次的所有请求
+    """
+    
+    def __init__(self, batch_fn: BatchPredictFn, window_ms: float = 5.0, max_batch: int = 64):
+        """
+        Args:
+            batch_fn: 批量预测协程函数
+            window_ms: 收集窗口（毫秒），组内第一个请求到达后开始计时
+            max_batch: 组内请求数达到上限时不再等待，立即提交
+        """
+        if window_ms < 0:
+            raise ValueError(f"window_ms不能为负数: {window_ms}")
+        if max_batch < 1:
+            raise ValueError(f"max_batch必须为正整数: {max_batch}")
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        
+        self._pending: Dict[Tuple[str, bool], List[Tuple[int, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, bool], asyncio.TimerHandle] = {}
+        self._tasks = set()
+        
+        self.requests = 0
+        self.batches = 0
+        self.engine_horizons = 0  # 去重后实际计算的预测期数
+    
+    async def submit(self, target: str, horizon: int, use_hybrid: bool) -> Dict[str, Any]:
+        """
+        提交一个预测请求并等待所在批次的结果
+        
+        Returns:
+            与PredictionEngine.predict相同格式的结果（相同请求共享同一结果，调用方不应修改）
+        """
+        loop = asyncio.get_running_loop()
+        key = (target, use_hybrid)
+        future = loop.create_future()
+        waiters = self._pending.setdefault(key, [])
+        waiters.append((horizon, future))
+        self.requests += 1
+        
+        if len(waiters) >= self.max_batch:
+            self._flush(key)
+        elif len(waiters) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        
+        return await future
+    
+    def _flush(self, key: Tuple[str, bool]):
+        """结束分组的收集窗口并提交批量调用"""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        waiters = self._pending.pop(key, None)
+        if not waiters:
+            return
+        
+        task = asyncio.ensure_future(self._run_batch(key, waiters))
+        # 保留任务引用，避免执行中被回收
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, key: Tuple[str, bool], waiters: List[Tuple[int, asyncio.Future]]):
+        """执行一次批量预测并分发结果"""
+        target, use_hybrid = key
+        horizons = [horizon for horizon, _ in waiters]
+        self.batches += 1
+        self.engine_horizons += len(set(horizons))
+        
+        try:
+            results = await self.batch_fn(target, horizons, use_hybrid)
+        except Exception as e:
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(waiters, results):
+            # 客户端断开时请求已被取消
+            if not future.done():
+                future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """合并统计"""
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "engine_horizons": self.engine_horizons,
+            "pending": sum(len(waiters) for waiters in self._pending.values()),
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,95 @@
+"""
+只读接口的版本化响应缓存
+以(接口路径, 查询参数, 数据/模型版本)为键缓存序列化后的响应体，
+并生成ETag，客户端携带If-None-Match轮询时直接返回304
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应体"""
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+
+
+class ResponseCache:
+    """
+    LRU响应缓存
+    
+    版本号是键的一部分：数据更新/模型重训练后版本递增，旧条目不再命中，
+    随后被LRU淘汰，无需显式失效。只在事件循环线程中读写，无需加锁
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        if max_entries < 0:
+            raise ValueError(f"max_entries不能为负数: {max_entries}")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+    
+    @staticmethod
+    def make_key(path: str, query_items: Iterable[Tuple[str, str]], version: Hashable) -> Tuple:
+        """缓存键：接口路径 + 排序后的查询参数 + 版本"""
+        return (path, tuple(sorted(query_items)), version)
+    
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """强ETag：响应体内容哈希，内容不变时跨版本、跨进程重启保持一致"""
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """If-None-Match是否匹配（弱比较，支持逗号分隔的多个ETag与*）"""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate == '*':
+                return True
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        return False
+    
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        """查询缓存"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key: Tuple, body: bytes, media_type: str = "application/json") -> CachedResponse:
+        """写入缓存并返回带ETag的条目"""
+        entry = CachedResponse(body=body, etag=self.make_etag(body), media_type=media_type)
+        if self.max_entries > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {
+            "max_entries": self.max_entries,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
@@ -25,6 +25,9 @@ class DataManager:
         self.processed_data = {}
         self.is_initialized = False
         
+        # 数据版本：每次加载/更新后递增，API响应缓存以此判断数据是否过期
+        self.data_version = 0
+        
     def initialize(self):
         """初始化数据管理器"""
         print("🔄 初始化数据管理器...")
@@ -42,6 +45,7 @@ class DataManager:
         # 使用模拟数据
         generator = MacroDataGenerator()
         self.raw_data = generator.generate_all_data()
+        self.data_version += 1
         
     def get_gdp_data(self, start_date: Optional[str] = None,
                      end_date: Optional[str] = None) -> pd.DataFrame:
@@ -63,7 +67,7 @@ class DataManager:
             df = df[df.index <= end_date]
             
         # 重置索引以便序列化
-        df = df.reset_index()
+        df = df.rename_axis('date').reset_index()
         df['date'] = df['date'].dt.strftime('%Y-%m-%d')
         
         return df
@@ -94,7 +98,7 @@ class DataManager:
             df = df[df.index <= end_date]
             
         # 重置索引
-        df = df.reset_index()
+        df = df.rename_axis('date').reset_index()
         df['date'] = df['date'].dt.strftime('%Y-%m-%d')
         
         return df
@@ -113,7 +117,7 @@ class DataManager:
         if end_date:
             df = df[df.index <= end_date]
             
-        df = df.reset_index()
+        df = df.rename_axis('date').reset_index()
         df['date'] = df['date'].dt.strftime('%Y-%m-%d')
         
         return df
@@ -132,11 +136,43 @@ class DataManager:
         if end_date:
             df = df[df.index <= end_date]
             
-        df = df.reset_index()
+        df = df.rename_axis('date').reset_index()
         df['date'] = df['date'].dt.strftime('%Y-%m-%d')
         
         return df
         
+    def get_frame(self, dataset: str, indicator: Optional[str] = None,
+                  start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取按指标/日期筛选后的原始数据框（保留日期索引与数值类型）
+        
+        供列式序列化直接按列读取，调用方不应修改返回的数据框
+        
+        Args:
+            dataset: 数据集名称 (gdp, monthly, daily, weekly)
+            indicator: 特定指标名称
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            以日期为索引的DataFrame
+        """
+        if dataset not in self.raw_data:
+            raise ValueError(f"未知数据集: {dataset}")
+        df = self.raw_data[dataset]
+        
+        if indicator and indicator in df.columns:
+            df = df[['province', indicator]]
+            
+        # 与get_*_data相同的比较规则（部分日期如'2020-03'按该时刻比较，不扩展为整个月）
+        if start_date:
+            df = df[df.index >= start_date]
+        if end_date:
+            df = df[df.index <= end_date]
+            
+        return df
+        
     def get_latest_snapshot(self) -> Dict[str, Any]:
         """
         获取最新数据快照
@@ -197,6 +233,7 @@ class DataManager:
         
         # 实际部署时实现数据更新逻辑
         # 这里简化处理
+        self.data_version += 1
         
         print("✅ 数据更新完成")
         return True
@@ -0,0 +1,77 @@
+"""
+推理任务执行器
+把阻塞的NumPy/PyTorch/scipy计算从事件循环转移到有界线程池，
+限制并发数与排队深度，保证事件循环（健康检查等）在负载下仍可响应
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+
+class ExecutorOverloadedError(RuntimeError):
+    """排队任务数超过上限"""
+
+
+class InferenceExecutor:
+    """
+    有界推理执行器
+    
+    使用线程池：预测引擎的模型状态保存在API进程内，NumPy/PyTorch的
+    计算内核会释放GIL，线程即可并行；进程池需要在每个子进程中各自
+    重建预测引擎，代价与重训练相当
+    """
+    
+    def __init__(self, max_workers: int = 4, max_queue: int = 32):
+        """
+        Args:
+            max_workers: 同时执行的计算任务数
+            max_queue: 等待执行的任务数上限，超过时立即拒绝而不是无限排队
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers必须为正整数: {max_workers}")
+        if max_queue < 0:
+            raise ValueError(f"max_queue不能为负数: {max_queue}")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        
+        # 只在事件循环线程中读写，无需加锁
+        self.in_flight = 0  # 执行中+排队中的任务数
+        self.rejected = 0
+        self.completed = 0
+    
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞函数并等待结果
+        
+        Raises:
+            ExecutorOverloadedError: 执行中与排队中的任务已达上限
+        """
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorOverloadedError(
+                f"推理任务已达上限 (并发{self.max_workers}, 排队{self.max_queue})"
+            )
+        
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """执行器统计"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+    
+    def shutdown(self, wait: bool = True):
+        """关闭线程池"""
+        self._pool.shutdown(wait=wait)
@@ -4,14 +4,16 @@
 """
 import os
 import sys
+import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence
 from datetime import datetime
 import json
 import pickle
+from scipy.stats import norm
 
 from models.midas.midas_model import MIDASModel, MIDASEnsemble
 from models.dfm.dfm_model import DFMModel
@@ -37,6 +39,15 @@ class PredictionEngine:
         self.processed_data = {}
         self.is_initialized = False
         
+        # 模型版本：每次训练/增量更新后递增，API响应缓存以此判断结果是否过期
+        self.model_version = 0
+        self.last_trained = None
+        
+        # 重训练在执行器中与预测并发：新模型全部拟合完成后在锁内一次性替换
+        self._model_lock = threading.Lock()
+        # 重训练与DFM增量更新互斥，避免基于旧模型的更新覆盖新训练的模型
+        self._update_lock = threading.Lock()
+        
         # 预测历史
         self.prediction_history = []
         
@@ -99,9 +110,9 @@ class PredictionEngine:
         
         # 1. MIDAS模型
         print("      训练MIDAS模型...")
-        self.midas_model = MIDASModel(n_lags=12)
+        midas_model = MIDASModel(n_lags=12)
         if 'electricity' in monthly_aligned.columns:
-            self.midas_model.fit(
+            midas_model.fit(
                 gdp_aligned['gdp_value_clean'], 
                 monthly_aligned['electricity']
             )
@@ -109,14 +120,16 @@ class PredictionEngine:
         # 2. DFM模型
         print("      训练DFM模型...")
         monthly_numeric = monthly_aligned.select_dtypes(include=[np.number])
-        self.dfm_model = DFMModel(n_factors=3)
-        self.dfm_model.fit(monthly_numeric)
+        dfm_model = DFMModel(n_factors=3)
+        dfm_model.fit(monthly_numeric)
         
-        # 3. TSLM适配器
-        print("      初始化TSLM适配器...")
-        config = TSLMConfig(model_name="timesfm", context_length=128, prediction_length=12)
-        self.tslm_adapter = TSLMAdapter(config)
-        self.tslm_adapter.initialize(use_mock=True)
+        # 3. TSLM适配器（与训练数据无关，重训练时复用；模型在首次预测时才构建）
+        tslm_adapter = self.tslm_adapter
+        if tslm_adapter is None:
+            print("      初始化TSLM适配器...")
+            config = TSLMConfig(model_name="timesfm", context_length=128, prediction_length=12)
+            tslm_adapter = TSLMAdapter(config)
+            tslm_adapter.initialize(use_mock=True, lazy=True)
         
         # 4. 混合预测器
         print("      构建混合预测器...")
@@ -125,42 +138,173 @@ class PredictionEngine:
             nonlinear_weight=0.4,
             use_residual_approach=True
         )
-        self.hybrid_predictor = HybridPredictor(hybrid_config)
-        self.hybrid_predictor.set_models(self.midas_model, self.tslm_adapter)
-        self.hybrid_predictor.fit(gdp_aligned['gdp_value_clean'])
+        hybrid_predictor = HybridPredictor(hybrid_config)
+        hybrid_predictor.set_models(midas_model, tslm_adapter)
+        hybrid_predictor.fit(gdp_aligned['gdp_value_clean'])
+        
+        # 5. 替换模型：并发的读取方只会看到完整的旧模型组或新模型组，版本号最后递增
+        with self._model_lock:
+            self.midas_model = midas_model
+            self.dfm_model = dfm_model
+            self.tslm_adapter = tslm_adapter
+            self.hybrid_predictor = hybrid_predictor
+            self.last_trained = datetime.now().isoformat()
+            self.model_version += 1
         
     def predict(self, target: str = "gdp", horizon: int = 1, 
-                use_hybrid: bool = True) -> Dict[str, Any]:
+                use_hybrid: bool = True, confidence_level: float = 0.9) -> Dict[str, Any]:
         """
         进行预测
         
         Args:
-            target: 预测目标
+            target: 预测目标（"gdp"或DFM面板中的月度指标名）
             horizon: 预测期数
             use_hybrid: 是否使用混合模型
+            confidence_level: 预测区间的置信水平
             
         Returns:
-            预测结果字典
+            预测结果字典（prediction_std为各期预测标准差，
+            confidence_interval为最后一期的解析预测区间）
         """
         if not self.is_initialized:
             raise RuntimeError("预测引擎尚未初始化")
             
-        if use_hybrid and self.hybrid_predictor:
-            result = self.hybrid_predictor.predict(horizon)
-        else:
-            # 仅使用线性模型
-            linear_pred = self.midas_model.predict(
-                self.processed_data['monthly']['electricity'], 
-                horizon
-            )
+        result = self._predict(target, horizon, use_hybrid, confidence_level)
+        self._record_prediction(target, horizon, result)
+        return result
+        
+    def predict_batch(self, target: str = "gdp", horizons: Sequence[int] = (1,),
+                      use_hybrid: bool = True, confidence_level: float = 0.9) -> List[Dict[str, Any]]:
+        """
+        一次处理同一目标、同一模型组合下多个预测期的请求
+        
+        只按最大预测期计算一次（TSLM残差预测、DFM预测各一次），
+        各请求的结果由该次结果切片得到，与单独调用predict一致。
+        
+        Args:
+            target: 预测目标
+            horizons: 各请求的预测期（可重复，每个请求记录一条预测历史）
+            use_hybrid: 是否使用混合模型
+            confidence_level: 预测区间的置信水平
+            
+        Returns:
+            与horizons一一对应的预测结果（相同预测期共享同一结果）
+        """
+        if not self.is_initialized:
+            raise RuntimeError("预测引擎尚未初始化")
+        if len(horizons) == 0:
+            return []
+            
+        forecast = self._forecast(target, max(horizons), use_hybrid)
+        by_horizon = {
+            horizon: self._finalize(self._slice_forecast(forecast, horizon), confidence_level)
+            for horizon in set(horizons)
+        }
+        
+        results = []
+        for horizon in horizons:
+            self._record_prediction(target, horizon, by_horizon[horizon])
+            results.append(by_horizon[horizon])
+        return results
+        
+    def _predict(self, target: str, horizon: int, use_hybrid: bool,
+                 confidence_level: float) -> Dict[str, Any]:
+        """计算单个预测期的预测结果（不记录历史）"""
+        return self._finalize(self._forecast(target, horizon, use_hybrid), confidence_level)
+        
+    def _forecast(self, target: str, horizon: int, use_hybrid: bool) -> Dict[str, Any]:
+        """
+        计算预测的各组成部分（不含预测区间）
+        
+        Returns:
+            result: 预测结果字典
+            variance: 各期预测误差方差
+            trailing_linear: 线性部分是否为MIDAS末尾的拟合值（切片时取末尾而非开头）
+            combine: 由线性部分与非线性修正重新计算最终预测的函数
+        """
+        # 取同一组模型的快照，避免与并发的重训练交错
+        with self._model_lock:
+            midas_model = self.midas_model
+            dfm_model = self.dfm_model
+            hybrid_predictor = self.hybrid_predictor
+            
+        linear_only = lambda linear_pred, nonlinear_pred: linear_pred
+        if dfm_model and dfm_model.columns is not None and target in dfm_model.columns:
+            # 月度指标：DFM预测，误差方差由滤波协方差经A、Q解析传播
+            idx = dfm_model.columns.get_loc(target)
+            forecast = dfm_model.forecast(horizon)
+            linear_pred = forecast['mean'][:, idx]
             result = {
                 'linear_prediction': linear_pred,
                 'nonlinear_correction': np.zeros(horizon),
                 'final_prediction': linear_pred,
                 'model_weights': {'linear': 1.0, 'nonlinear': 0.0}
             }
+            return {'result': result, 'variance': forecast['variance'][:, idx],
+                    'trailing_linear': False, 'combine': linear_only}
+            
+        if use_hybrid and hybrid_predictor:
+            result = hybrid_predictor.predict(horizon)
+            result['nonlinear_correction'] = result['nonlinear_prediction']
+            result['model_weights'] = {'linear': result['linear_weight'],
+                                       'nonlinear': result['nonlinear_weight']}
+            return {'result': result, 'variance': hybrid_predictor.forecast_variance(horizon),
+                    'trailing_linear': True, 'combine': hybrid_predictor.combine}
             
-        # 记录预测历史
+        # 仅使用线性模型
+        linear_pred = midas_model.predict(
+            self.processed_data['monthly']['electricity'], 
+            horizon
+        )
+        result = {
+            'linear_prediction': linear_pred,
+            'nonlinear_correction': np.zeros(horizon),
+            'final_prediction': linear_pred,
+            'model_weights': {'linear': 1.0, 'nonlinear': 0.0}
+        }
+        return {'result': result, 'variance': midas_model.forecast_variance(horizon),
+                'trailing_linear': True, 'combine': linear_only}
+        
+    @staticmethod
+    def _slice_forecast(forecast: Dict[str, Any], horizon: int) -> Dict[str, Any]:
+        """
+        从较长预测期的结果截取较短预测期的结果
+        
+        残差预测、DFM预测与误差方差是向前的路径，取前horizon期；
+        MIDAS线性部分是末尾horizon个拟合值，取末尾；最终预测按截取后的两部分重新集成
+        """
+        full = len(forecast['variance'])
+        if horizon == full:
+            return forecast
+            
+        result = dict(forecast['result'])
+        linear_pred = np.asarray(result['linear_prediction'])
+        result['linear_prediction'] = (linear_pred[full - horizon:] if forecast['trailing_linear']
+                                       else linear_pred[:horizon])
+        result['nonlinear_correction'] = np.asarray(result['nonlinear_correction'])[:horizon]
+        if 'nonlinear_prediction' in result:
+            result['nonlinear_prediction'] = result['nonlinear_correction']
+        result['final_prediction'] = forecast['combine'](result['linear_prediction'],
+                                                         result['nonlinear_correction'])
+        return {**forecast, 'result': result, 'variance': forecast['variance'][:horizon]}
+        
+    @staticmethod
+    def _finalize(forecast: Dict[str, Any], confidence_level: float) -> Dict[str, Any]:
+        """附加各期预测标准差与最后一期的解析预测区间"""
+        result = dict(forecast['result'])
+        std = np.sqrt(forecast['variance'])
+        z = norm.ppf(0.5 + confidence_level / 2)
+        final = np.atleast_1d(result['final_prediction'])
+        result['prediction_std'] = std
+        result['confidence_interval'] = {
+            'level': confidence_level,
+            'lower': float(final[-1] - z * std[-1]),
+            'upper': float(final[-1] + z * std[-1])
+        }
+        return result
+        
+    def _record_prediction(self, target: str, horizon: int, result: Dict[str, Any]):
+        """记录预测历史"""
         prediction_record = {
             'timestamp': datetime.now().isoformat(),
             'target': target,
@@ -169,12 +313,13 @@ class PredictionEngine:
         }
         self.prediction_history.append(prediction_record)
         
-        return result
-        
     def nowcast(self, target: str = "gdp") -> Dict[str, Any]:
         """
         现时预测
         
+        Args:
+            target: 预测目标（"gdp"或DFM面板中的月度指标名）
+            
         Returns:
             现时预测结果
         """
@@ -203,7 +348,7 @@ class PredictionEngine:
         return {
             'current_quarter': current_quarter,
             'linear_nowcast': float(prediction['linear_prediction'][0]),
-            'nonlinear_correction': float(prediction['nonlinear_prediction'][0]),
+            'nonlinear_correction': float(prediction['nonlinear_correction'][0]),
             'final_nowcast': float(prediction['final_prediction'][0]),
             'data_availability': data_availability
         }
@@ -226,7 +371,7 @@ class PredictionEngine:
                 "dfm": self.dfm_model is not None,
                 "tslm": self.tslm_adapter is not None and self.tslm_adapter.is_initialized
             },
-            "last_trained": datetime.now().isoformat() if self.is_initialized else None,
+            "last_trained": self.last_trained if self.is_initialized else None,
             "performance_metrics": self._get_performance_metrics()
         }
         
@@ -270,6 +415,43 @@ class PredictionEngine:
             "factors_preview": factors_df.tail(5).to_dict()
         }
         
+    def forecast_dfm(self, horizon: int = 4,
+                     levels: Sequence[float] = (0.5, 0.9)) -> Dict[str, Any]:
+        """
+        DFM全部序列的多步预测及预测区间（供预测请求与扇形图共用一次批量计算）
+        
+        Args:
+            horizon: 预测期数
+            levels: 预测区间的置信水平
+        """
+        if not self.dfm_model or self.dfm_model.factors is None:
+            raise RuntimeError("DFM模型尚未训练")
+            
+        forecast = self.dfm_model.forecast(horizon)
+        mean = forecast['mean']
+        std = np.sqrt(forecast['variance'])
+        z = norm.ppf(0.5 + np.asarray(levels) / 2)
+        
+        series = {}
+        for i, name in enumerate(self.dfm_model.columns):
+            series[name] = {
+                "mean": mean[:, i].tolist(),
+                "std": std[:, i].tolist(),
+                "bands": {
+                    f"{level:.0%}": {
+                        "lower": (mean[:, i] - zq * std[:, i]).tolist(),
+                        "upper": (mean[:, i] + zq * std[:, i]).tolist()
+                    }
+                    for level, zq in zip(levels, z)
+                }
+            }
+            
+        return {
+            "horizon": horizon,
+            "levels": list(levels),
+            "series": series
+        }
+        
     def get_attribution(self, target: str = "gdp", 
                         date: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -306,10 +488,56 @@ class PredictionEngine:
             }
         }
         
+    def update_dfm(self, new_monthly: pd.DataFrame) -> Dict[str, Any]:
+        """
+        新月度数据发布时增量更新DFM模型（无需retrain完整重建）
+        
+        在DFM副本上推进滤波（满足更新策略时在副本上重新估计），完成后与追加了新数据的
+        processed_data一起在锁内替换，并发的预测只会看到更新前或更新后的完整状态
+        
+        Args:
+            new_monthly: 新增的月度指标数据（以日期为索引，须晚于已有数据，缺失的指标记为NaN）
+            
+        Returns:
+            更新后的期数、自上次完整估计以来的增量期数及是否触发了重新估计
+        """
+        if not self.is_initialized:
+            raise RuntimeError("预测引擎尚未初始化")
+        if len(new_monthly) == 0:
+            raise ValueError("没有新增数据")
+            
+        with self._update_lock:
+            with self._model_lock:
+                dfm_model = self.dfm_model
+                monthly = self.processed_data['monthly']
+            if not dfm_model or dfm_model.kalman is None:
+                raise RuntimeError("DFM模型尚未训练")
+            if new_monthly.index.min() <= monthly.index[-1]:
+                raise ValueError(f"新数据日期必须晚于已有数据的最后一期: {monthly.index[-1]:%Y-%m-%d}")
+                
+            updated = dfm_model.copy()
+            updated.update(new_monthly.reindex(columns=updated.columns))
+            processed_data = {**self.processed_data,
+                              'monthly': pd.concat([monthly, new_monthly])}
+            
+            with self._model_lock:
+                self.dfm_model = updated
+                self.processed_data = processed_data
+                self.model_version += 1
+                
+        return {
+            "n_periods": len(updated.factors),
+            "rows_since_fit": updated.rows_since_fit,
+            "refit": updated.rows_since_fit == 0
+        }
+        
     def retrain(self):
         """
         重新训练所有模型
         """
         print("🔄 重新训练模型...")
-        self._build_models()
+        with self._update_lock:
+            self._build_models()
+        # 新模型替换后再清理旧残差的预测缓存
+        self.tslm_adapter.invalidate_cache()
         print("✅ 模型重训练完成")
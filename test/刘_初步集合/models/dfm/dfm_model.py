@@ -2,13 +2,14 @@
 DFM (Dynamic Factor Model) 动态因子模型
 使用PCA提取共同因子，结合卡尔曼滤波处理缺失数据
 """
+import copy
 import numpy as np
 import pandas as pd
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Union
 from dataclasses import dataclass
-from scipy.linalg import solve_discrete_are
+from scipy.linalg import solve_discrete_are, cho_factor, cho_solve
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -21,25 +22,54 @@ class DFMParams:
     error_order: int  # 误差自回归阶数
 
 
+@dataclass
+class DFMUpdatePolicy:
+    """DFM增量更新策略：满足任一条件时放弃增量更新，改为完整重新估计"""
+    max_new_rows: Optional[int] = 12  # 自上次完整估计以来累计新增期数上限（None表示不限）
+    max_error_ratio: Optional[float] = 2.0  # 新增期重构误差 / 样本内重构误差上限（None表示不检查）
+
+
 class KalmanFilterDFM:
     """
     用于DFM的卡尔曼滤波器
     处理数据末端缺失（Ragged Edge）问题
     """
     
-    def __init__(self, n_factors: int, n_series: int):
+    def __init__(self, n_factors: int, n_series: int, steady_state: bool = False,
+                 steady_state_tol: float = 1e-9, update_method: str = 'covariance'):
+        """
+        Args:
+            n_factors: 因子数量
+            n_series: 观测序列数量
+            steady_state: 是否启用稳态卡尔曼增益（完整观测且协方差收敛后复用稳态增益）
+            steady_state_tol: 判定协方差收敛到稳态解的绝对误差阈值
+            update_method: 更新步骤形式 ('covariance': 标准形式，对n_series x n_series
+                           新息协方差求逆; 'information': 信息滤波/Woodbury形式，
+                           要求R为对角阵，只对n_factors x n_factors矩阵做Cholesky分解;
+                           'univariate': 逐序列顺序更新，要求R为对角阵，缺失值直接跳过)
+        """
+        if update_method not in ('covariance', 'information', 'univariate'):
+            raise ValueError(f"不支持的更新方式: {update_method}")
         self.n_factors = n_factors
         self.n_series = n_series
+        self.steady_state = steady_state
+        self.update_method = update_method
+        self.steady_state_tol = steady_state_tol
         
         # 状态空间模型参数
         self.A = None  # 状态转移矩阵
         self.C = None  # 观测矩阵（因子载荷）
         self.Q = None  # 状态噪声协方差
-        self.R = None  # 观测噪声协方差
+        self.R = None  # 观测噪声协方差（n_series x n_series，或为对角阵时以长度n_series的方差向量存储）
         
         # 滤波结果
         self.filtered_states = None
         self.filtered_covs = None
+        self.predicted_covs = None  # 预测协方差 P_{t|t-1}，供平滑器复用
+        self.predicted_cov_chols = None  # P_{t|t-1}的Cholesky下三角因子，平滑增益直接回代求解
+        self.smoother_gains = None  # 最近一次smooth()的平滑增益 J_t
+        self._steady_cache = None  # ((A, C, Q, R), 稳态解)，参数未替换时复用，避免逐块重解Riccati方程
+        self._buffers = {}  # 增量滤波结果的预分配缓冲区 {属性名: (缓冲区, 已用行数)}
         
     def initialize_params(self, factors: np.ndarray, loadings: np.ndarray):
         """
@@ -71,6 +101,135 @@ class KalmanFilterDFM:
         # 这里简化处理，实际应该使用完整的数据
         self.R = np.eye(self.n_series) * 0.1
         
+    def noise_variances(self) -> np.ndarray:
+        """各序列的观测噪声方差（R的对角元素）"""
+        return self.R if self.R.ndim == 1 else np.diag(self.R)
+        
+    def noise_cov(self) -> np.ndarray:
+        """观测噪声协方差矩阵R（以方差向量存储时展开为对角阵）"""
+        return np.diag(self.R) if self.R.ndim == 1 else self.R
+        
+    def _diagonal_noise(self) -> Optional[np.ndarray]:
+        """R为对角阵（或以方差向量存储）时返回对角元素，否则返回None"""
+        R_diag = self.noise_variances()
+        if self.R.ndim == 2 and np.count_nonzero(self.R - np.diag(R_diag)):
+            return None
+        return R_diag
+        
+    def _steady_state_gain(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        求解离散代数Riccati方程，得到稳态预测协方差、卡尔曼增益和滤波协方差
+        
+        结果按参数对象缓存：分块滤波/增量更新时A、C、Q、R未被替换则直接复用
+        
+        Returns:
+            (P_pred稳态, K稳态, P_filt稳态)，无稳态解时返回None
+        """
+        params = (self.A, self.C, self.Q, self.R)
+        if self._steady_cache is not None and all(
+                cached is current for cached, current in zip(self._steady_cache[0], params)):
+            return self._steady_cache[1]
+            
+        steady = self._solve_steady_state()
+        self._steady_cache = (params, steady)
+        return steady
+        
+    def _solve_steady_state(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        求解稳态Riccati方程
+        
+        R为对角阵时方程只依赖 C'R⁻¹C：取 L L' = C'R⁻¹C，等价于观测矩阵L'、观测噪声I的
+        k x k方程，增益 K = P_filt C'R⁻¹，不构造n_series x n_series矩阵
+        """
+        identity = np.eye(self.n_factors)
+        R_diag = self._diagonal_noise()
+        try:
+            if R_diag is not None:
+                CtRinv = self.C.T / R_diag
+                CtRinvC = CtRinv @ self.C
+                P_pred_ss = solve_discrete_are(self.A.T, np.linalg.cholesky(CtRinvC),
+                                               self.Q, identity)
+            else:
+                P_pred_ss = solve_discrete_are(self.A.T, self.C.T, self.Q, self.R)
+        except (np.linalg.LinAlgError, ValueError) as e:
+            print(f"⚠️ Riccati方程求解失败，使用时变卡尔曼增益: {e}")
+            return None
+            
+        if R_diag is not None:
+            info = cho_solve(cho_factor(P_pred_ss), identity) + CtRinvC
+            P_filt_ss = cho_solve(cho_factor(info), identity)
+            K_ss = P_filt_ss @ CtRinv
+        else:
+            S = self.C @ P_pred_ss @ self.C.T + self.R
+            K_ss = np.linalg.solve(S, self.C @ P_pred_ss).T
+            P_filt_ss = (identity - K_ss @ self.C) @ P_pred_ss
+        
+        return P_pred_ss, K_ss, P_filt_ss
+        
+    def _information_update(self, F_pred: np.ndarray, P_pred_chol: np.ndarray,
+                            y: np.ndarray, C: np.ndarray, CtRinv: np.ndarray,
+                            CtRinvC: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        信息形式（Woodbury恒等式）的更新步骤
+        
+        P_filt = (P_pred⁻¹ + C'R⁻¹C)⁻¹,  F_filt = F_pred + P_filt C'R⁻¹ (y - C F_pred)
+        
+        R为对角阵时C'R⁻¹只是按列缩放，全部分解都在k x k（k = n_factors）上进行
+        
+        Args:
+            F_pred: 预测状态
+            P_pred_chol: 预测协方差的Cholesky下三角因子（滤波时已分解）
+            y: 观测值
+            C: 观测矩阵（仅包含可用序列）
+            CtRinv: C'R⁻¹ (k x n)
+            CtRinvC: C'R⁻¹C (k x k)，为None时现算
+            
+        Returns:
+            (滤波状态, 滤波协方差)
+        """
+        if CtRinvC is None:
+            CtRinvC = CtRinv @ C
+        identity = np.eye(self.n_factors)
+        
+        info = cho_solve((P_pred_chol, True), identity) + CtRinvC
+        info_chol = cho_factor(info)
+        
+        P_filt = cho_solve(info_chol, identity)
+        F_filt = F_pred + cho_solve(info_chol, CtRinv @ (y - C @ F_pred))
+        
+        return F_filt, P_filt
+        
+    def _univariate_update(self, F_pred: np.ndarray, P_pred: np.ndarray,
+                           y: np.ndarray, R_diag: np.ndarray,
+                           observed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        单变量（顺序）更新步骤
+        
+        R为对角阵时各序列观测误差独立，可逐条吸收观测: 每条只涉及标量新息方差，
+        无需矩阵求逆，也无需为可用序列构造C、R子矩阵
+        
+        Args:
+            F_pred: 预测状态
+            P_pred: 预测协方差
+            y: 当期全部观测值
+            R_diag: R的对角元素
+            observed: 可用序列的索引
+            
+        Returns:
+            (滤波状态, 滤波协方差)
+        """
+        F = F_pred.copy()
+        P = P_pred.copy()
+        
+        for i in observed:
+            c = self.C[i]
+            Pc = P.dot(c)
+            K = Pc / (c.dot(Pc) + R_diag[i])
+            F += K * (y[i] - c.dot(F))
+            P -= K[:, None] * Pc
+            
+        return F, P
+        
     def filter(self, observations: np.ndarray, 
                missing_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -88,6 +247,7 @@ class KalmanFilterDFM:
         # 初始化
         F_pred = np.zeros((T, self.n_factors))
         P_pred = np.zeros((T, self.n_factors, self.n_factors))
+        P_chol = np.zeros((T, self.n_factors, self.n_factors))
         F_filt = np.zeros((T, self.n_factors))
         P_filt = np.zeros((T, self.n_factors, self.n_factors))
         
@@ -95,19 +255,141 @@ class KalmanFilterDFM:
         F_filt[0] = np.zeros(self.n_factors)
         P_filt[0] = np.eye(self.n_factors) * 10
         
+        self._run_filter(observations, missing_mask, F_pred, P_pred, P_chol, F_filt, P_filt)
+        
+        self.filtered_states = F_filt
+        self.filtered_covs = P_filt
+        self.predicted_covs = P_pred
+        self.predicted_cov_chols = P_chol
+        
+        return F_filt, P_filt
+    
+    def update(self, new_observations: np.ndarray,
+               missing_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        增量滤波：从已存储的最后一期状态出发，仅对新观测做预测+更新，
+        结果追加到filtered_states/filtered_covs/predicted_covs/predicted_cov_chols
+        （追加到按容量倍增预分配的缓冲区，摊销代价为O(新增期数)，不复制历史）
+        
+        Args:
+            new_observations: 新观测数据 (T_new x n_series)
+            missing_mask: 新观测的缺失掩码 (T_new x n_series)
+            
+        Returns:
+            (新增各期的滤波状态, 状态协方差)
+        """
+        if self.filtered_states is None:
+            raise ValueError("请先运行filter()")
+            
+        T_new = new_observations.shape[0]
+        
+        # 第0行放置上一期滤波结果作为起点
+        F_pred = np.zeros((T_new + 1, self.n_factors))
+        P_pred = np.zeros((T_new + 1, self.n_factors, self.n_factors))
+        P_chol = np.zeros((T_new + 1, self.n_factors, self.n_factors))
+        F_filt = np.zeros((T_new + 1, self.n_factors))
+        P_filt = np.zeros((T_new + 1, self.n_factors, self.n_factors))
+        F_filt[0] = self.filtered_states[-1]
+        P_filt[0] = self.filtered_covs[-1]
+        
+        pad = np.zeros((1, self.n_series))
+        observations = np.vstack([pad, new_observations])
+        if missing_mask is not None:
+            missing_mask = np.vstack([pad.astype(bool), missing_mask])
+            
+        self._run_filter(observations, missing_mask, F_pred, P_pred, P_chol, F_filt, P_filt)
+        
+        self._append_rows('filtered_states', F_filt[1:])
+        self._append_rows('filtered_covs', P_filt[1:])
+        self._append_rows('predicted_covs', P_pred[1:])
+        self._append_rows('predicted_cov_chols', P_chol[1:])
+        
+        return F_filt[1:], P_filt[1:]
+    
+    def _append_rows(self, name: str, rows: np.ndarray):
+        """
+        把新增各期追加到结果数组name：数组是预分配缓冲区前n行的视图，
+        容量不足时按倍增重新分配；此前取得的视图（如并发读取方持有的）内容不变
+        """
+        current = getattr(self, name)
+        n, n_new = len(current), len(rows)
+        buffer, used = self._buffers.get(name, (None, 0))
+        # 缓冲区已被共享它的副本追加过（已用行数与当前长度不一致）时同样重新分配
+        if buffer is None or current.base is not buffer or used != n or len(buffer) < n + n_new:
+            buffer = np.empty((max(2 * (n + n_new), 16),) + current.shape[1:], dtype=current.dtype)
+            buffer[:n] = current
+        buffer[n:n + n_new] = rows
+        self._buffers[name] = (buffer, n + n_new)
+        setattr(self, name, buffer[:n + n_new])
+    
+    def _run_filter(self, observations: np.ndarray, missing_mask: Optional[np.ndarray],
+                    F_pred: np.ndarray, P_pred: np.ndarray, P_chol: np.ndarray,
+                    F_filt: np.ndarray, P_filt: np.ndarray):
+        """
+        从第1期开始逐期预测+更新，原地写入预分配的结果数组（第0期为给定初始状态）
+        
+        每期预测协方差只做一次Cholesky分解（P_chol），信息形式更新与平滑器都复用该因子
+        """
+        T = observations.shape[0]
+        
+        # 稳态增益：协方差收敛后，完整观测期直接复用，不再重复求逆
+        steady = self._steady_state_gain() if self.steady_state else None
+        converged = (steady is not None and
+                     np.max(np.abs(P_filt[0] - steady[2])) < self.steady_state_tol)
+        if steady is not None:
+            chol_ss = cho_factor(steady[0], lower=True)[0]
+        
+        # 信息形式与单变量形式都要求R为对角阵
+        use_information = self.update_method == 'information'
+        use_univariate = self.update_method == 'univariate'
+        if use_information or use_univariate:
+            R_diag = self._diagonal_noise()
+            if R_diag is None:
+                raise ValueError(f"{self.update_method}形式更新要求观测噪声协方差R为对角阵")
+        else:
+            R = self.noise_cov()
+        
+        # 信息形式：预先计算 C'R⁻¹ 与 C'R⁻¹C
+        if use_information:
+            CtRinv = self.C.T / R_diag
+            CtRinvC = CtRinv @ self.C
+        all_series = np.arange(self.n_series)
+        
         for t in range(1, T):
+            row_missing = missing_mask is not None and np.any(missing_mask[t])
+            
+            # ===== 稳态更新 =====
+            if steady is not None and converged and not row_missing:
+                P_pred_ss, K_ss, P_filt_ss = steady
+                F_pred[t] = self.A @ F_filt[t-1]
+                P_pred[t] = P_pred_ss
+                P_chol[t] = chol_ss
+                F_filt[t] = F_pred[t] + K_ss @ (observations[t] - self.C @ F_pred[t])
+                P_filt[t] = P_filt_ss
+                continue
+            
             # ===== 预测步骤 =====
             F_pred[t] = self.A @ F_filt[t-1]
             P_pred[t] = self.A @ P_filt[t-1] @ self.A.T + self.Q
+            P_chol[t] = cho_factor(P_pred[t], lower=True)[0]
             
             # ===== 更新步骤 =====
-            if missing_mask is not None and np.any(missing_mask[t]):
+            if row_missing:
                 # 处理缺失数据：只使用可用的观测
                 available = ~missing_mask[t]
-                if np.any(available):
+                if np.any(available) and use_univariate:
+                    F_filt[t], P_filt[t] = self._univariate_update(
+                        F_pred[t], P_pred[t], observations[t], R_diag, np.flatnonzero(available)
+                    )
+                elif np.any(available) and use_information:
+                    F_filt[t], P_filt[t] = self._information_update(
+                        F_pred[t], P_chol[t], observations[t, available],
+                        self.C[available], CtRinv[:, available]
+                    )
+                elif np.any(available):
                     C_avail = self.C[available]
                     y_avail = observations[t, available]
-                    R_avail = self.R[np.ix_(available, available)]
+                    R_avail = R[np.ix_(available, available)]
                     
                     # 卡尔曼增益
                     S = C_avail @ P_pred[t] @ C_avail.T + R_avail
@@ -121,39 +403,84 @@ class KalmanFilterDFM:
                     # 全部缺失，只使用预测
                     F_filt[t] = F_pred[t]
                     P_filt[t] = P_pred[t]
+            elif use_univariate:
+                # 完整观测（单变量形式）
+                F_filt[t], P_filt[t] = self._univariate_update(
+                    F_pred[t], P_pred[t], observations[t], R_diag, all_series
+                )
+            elif use_information:
+                # 完整观测（信息形式）
+                F_filt[t], P_filt[t] = self._information_update(
+                    F_pred[t], P_chol[t], observations[t], self.C, CtRinv, CtRinvC
+                )
             else:
                 # 完整观测
-                S = self.C @ P_pred[t] @ self.C.T + self.R
+                S = self.C @ P_pred[t] @ self.C.T + R
                 K = P_pred[t] @ self.C.T @ np.linalg.inv(S)
                 
                 y_pred = self.C @ F_pred[t]
                 F_filt[t] = F_pred[t] + K @ (observations[t] - y_pred)
                 P_filt[t] = (np.eye(self.n_factors) - K @ self.C) @ P_pred[t]
-        
-        self.filtered_states = F_filt
-        self.filtered_covs = P_filt
-        
-        return F_filt, P_filt
+                
+            # 缺失期会使协方差偏离稳态，需重新收敛后再切换到稳态增益
+            if steady is not None:
+                converged = (not row_missing and
+                             np.max(np.abs(P_filt[t] - steady[2])) < self.steady_state_tol)
     
-    def smooth(self) -> np.ndarray:
+    def smooth(self, return_covs: bool = False, 
+               window: Optional[int] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
         """
         卡尔曼平滑（Rauch-Tung-Striebel平滑器）
+        
+        复用filter()缓存的预测协方差及其Cholesky因子，平滑增益 J_t = P_t|t A' P_t+1|t⁻¹
+        不依赖后向递推，因此在后向循环之前由cho_solve回代一次求出，
+        后向循环只剩状态（和协方差）的更新
+        
+        Args:
+            return_covs: 是否同时返回平滑协方差
+            window: 仅平滑最后window期（用于只关心末端的现时预测刷新），
+                    此时返回值只包含这window期
+                    
+        Returns:
+            平滑状态，return_covs=True时返回 (平滑状态, 平滑协方差)
         """
         if self.filtered_states is None:
             raise ValueError("请先运行filter()")
             
         T = self.filtered_states.shape[0]
-        F_smooth = self.filtered_states.copy()
+        start = 0 if window is None else max(T - window, 0)
+        F_filt = self.filtered_states[start:]
+        P_filt = self.filtered_covs[start:]
         
-        for t in range(T-2, -1, -1):
-            # 平滑增益
-            P_pred = self.A @ self.filtered_covs[t] @ self.A.T + self.Q
-            J = self.filtered_covs[t] @ self.A.T @ np.linalg.inv(P_pred)
-            
+        # 下一期的预测状态与协方差（协方差及其Cholesky因子优先使用滤波时的缓存）
+        F_pred_next = F_filt[:-1] @ self.A.T
+        if self.predicted_covs is not None:
+            P_pred_next = self.predicted_covs[start+1:]
+            chols = self.predicted_cov_chols[start+1:]
+        else:
+            P_pred_next = self.A @ P_filt[:-1] @ self.A.T + self.Q
+            chols = [cho_factor(P, lower=True)[0] for P in P_pred_next]
+        
+        # 平滑增益: J_t' = P_t+1|t⁻¹ (A P_t|t)，每期两次k x k三角回代
+        AP = self.A @ P_filt[:-1]
+        J = np.empty_like(AP)
+        for t, chol in enumerate(chols):
+            J[t] = cho_solve((chol, True), AP[t]).T
+        self.smoother_gains = J
+        
+        F_smooth = F_filt.copy()
+        for t in range(len(F_smooth) - 2, -1, -1):
             # 平滑状态
-            F_smooth[t] = self.filtered_states[t] + J @ (F_smooth[t+1] - self.A @ self.filtered_states[t])
+            F_smooth[t] = F_filt[t] + J[t] @ (F_smooth[t+1] - F_pred_next[t])
+            
+        if not return_covs:
+            return F_smooth
             
-        return F_smooth
+        P_smooth = P_filt.copy()
+        for t in range(len(P_smooth) - 2, -1, -1):
+            P_smooth[t] = P_filt[t] + J[t] @ (P_smooth[t+1] - P_pred_next[t]) @ J[t].T
+            
+        return F_smooth, P_smooth
 
 
 class DFMModel:
@@ -172,20 +499,58 @@ class DFMModel:
     """
     
     def __init__(self, n_factors: int = 3, factor_order: int = 1, 
-                 error_order: int = 1):
+                 error_order: int = 1, steady_state: bool = False,
+                 kalman_update: str = 'covariance',
+                 update_policy: Optional[DFMUpdatePolicy] = None,
+                 estimation: str = 'pca', em_tol: float = 1e-4, em_max_iter: int = 100,
+                 pca_backend: str = 'auto'):
         """
         Args:
             n_factors: 共同因子数量
             factor_order: 因子自回归阶数
             error_order: 误差自回归阶数
+            steady_state: 卡尔曼滤波是否使用稳态增益（适合长样本日度面板）
+            kalman_update: 卡尔曼更新形式 ('covariance', 'information', 'univariate')，
+                           序列数量远大于因子数时推荐'information'，
+                           末端缺失严重的实时面板推荐'univariate'
+            update_policy: update()增量更新时触发完整重新估计的策略
+            estimation: 参数估计方式 ('pca': PCA因子+VAR(1)一次估计;
+                        'em': 以PCA为初值，交替卡尔曼平滑与闭式M步直至收敛)
+            em_tol: EM收敛阈值（因子载荷的最大相对变化）
+            em_max_iter: EM最大迭代次数（用于限制重训练耗时）
+            pca_backend: 因子提取的SVD后端 ('auto', 'full', 'randomized', 'arpack', 'incremental')，
+                         'auto'根据面板形状选择
         """
+        if estimation not in ('pca', 'em'):
+            raise ValueError(f"不支持的估计方式: {estimation}")
+        if pca_backend not in ('auto', 'full', 'randomized', 'arpack', 'incremental'):
+            raise ValueError(f"不支持的PCA后端: {pca_backend}")
+        self.pca_backend = pca_backend
         self.params = DFMParams(n_factors, factor_order, error_order)
+        self.estimation = estimation
+        self.em_tol = em_tol
+        self.em_max_iter = em_max_iter
+        self.em_iterations = 0
+        self.em_converged = None
+        self.steady_state = steady_state
+        self.kalman_update = kalman_update
+        self.update_policy = update_policy or DFMUpdatePolicy()
         self.scaler = StandardScaler()
         self.pca = None
         self.kalman = None
         self.loadings = None
         self.factors = None
         self.target_loading = None
+        self.target_idx = None
+        self._A_powers = None  # (A, A^0..A^h) 缓存，A重新估计后失效
+        
+        # 增量更新状态
+        self.data = None  # 最近一次完整估计所用的面板（流式拟合时为None）
+        self.released_rows: List[pd.DataFrame] = []  # 此后增量追加的各批新数据，重新估计时才合并
+        self.columns = None  # 拟合时的列结构
+        self.target_col = None
+        self.rows_since_fit = 0  # 自上次完整估计以来增量追加的期数
+        self.fit_error = None  # 样本内重构误差（标准化尺度）
         
     def preprocess_data(self, df: pd.DataFrame) -> np.ndarray:
         """
@@ -199,6 +564,19 @@ class DFMModel:
         
         return X_scaled
     
+    def _select_pca_backend(self, shape: Tuple[int, int]) -> str:
+        """
+        根据面板形状选择SVD后端
+        
+        小面板直接完整SVD；只需要少量因子的大面板使用随机化截断SVD，
+        时间和内存只随 n_factors 线性增长
+        """
+        if self.pca_backend != 'auto':
+            return self.pca_backend
+        if max(shape) <= 500 or self.params.n_factors >= 0.8 * min(shape):
+            return 'full'
+        return 'randomized'
+    
     def extract_factors_pca(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         使用PCA提取初始因子
@@ -206,7 +584,12 @@ class DFMModel:
         Returns:
             (因子矩阵, 因子载荷矩阵)
         """
-        self.pca = PCA(n_components=self.params.n_factors)
+        backend = self._select_pca_backend(X.shape)
+        if backend == 'incremental':
+            self.pca = IncrementalPCA(n_components=self.params.n_factors)
+        else:
+            self.pca = PCA(n_components=self.params.n_factors, svd_solver=backend,
+                           random_state=0 if backend == 'randomized' else None)
         factors = self.pca.fit_transform(X)
         loadings = self.pca.components_.T
         
@@ -231,18 +614,31 @@ class DFMModel:
         # 3. 初始化卡尔曼滤波器
         self.kalman = KalmanFilterDFM(
             self.params.n_factors, 
-            X_scaled.shape[1]
+            X_scaled.shape[1],
+            steady_state=self.steady_state,
+            update_method=self.kalman_update
         )
         self.kalman.initialize_params(factors_init, self.loadings)
         
         # 4. 使用卡尔曼滤波处理缺失数据
         missing_mask = df.isna().values
+        if self.estimation == 'em':
+            self._estimate_em(X_scaled, missing_mask)
+            self.loadings = self.kalman.C
         self.factors, _ = self.kalman.filter(X_scaled, missing_mask)
         
         # 5. 如果指定了目标变量，估计目标方程
         if target_col and target_col in df.columns:
-            target_idx = df.columns.get_loc(target_col)
-            self.target_loading = self.loadings[target_idx]
+            self.target_idx = df.columns.get_loc(target_col)
+            self.target_loading = self.loadings[self.target_idx]
+            
+        # 6. 记录增量更新所需的状态
+        self.data = df
+        self.released_rows = []
+        self.columns = df.columns
+        self.target_col = target_col
+        self.rows_since_fit = 0
+        self.fit_error = self._reconstruction_error(X_scaled, self.factors, missing_mask)
             
         print(f"✅ DFM模型拟合完成!")
         print(f"   解释的方差比例: {self.pca.explained_variance_ratio_.sum():.2%}")
@@ -250,9 +646,347 @@ class DFMModel:
         
         return self
     
+    def _standardize_chunk(self, chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        用已累积的标准化参数变换一个分块，缺失值在标准化尺度下填0（即均值填充）
+        
+        Returns:
+            (标准化后的分块, 缺失掩码)
+        """
+        values = chunk.to_numpy(dtype=float)
+        missing_mask = np.isnan(values)
+        X = (values - self.scaler.mean_) / self.scaler.scale_
+        X[missing_mask] = 0.0
+        return X, missing_mask
+    
+    def fit_streaming(self, chunks: Union[pd.DataFrame, Callable[[], Iterable[pd.DataFrame]]],
+                      target_col: Optional[str] = None, chunk_size: int = 1000):
+        """
+        流式（核外）拟合：分块扫描面板，峰值内存为 O(chunk_size x n_series)
+        
+        共扫描四遍数据源:
+        1. StandardScaler.partial_fit 累积各序列均值/方差（忽略缺失值）
+        2. IncrementalPCA.partial_fit 估计因子载荷
+        3. 逐块变换得到因子，累积VAR(1)矩估计所需的交叉乘积，得到A、Q
+        4. 逐块卡尔曼滤波（首块filter，之后update），同时累积重构误差
+        
+        观测噪声R以方差向量存储，滤波使用信息形式或单变量形式更新
+        （配置为协方差形式时改用信息形式），稳态Riccati方程只求解一次，
+        全程不构造n_series x n_series矩阵
+        
+        只保留 T x n_factors 的因子及其协方差，不保留原始面板，因此增量更新
+        触发重新估计时无法回退到fit()，需要重新调用fit_streaming
+        
+        Args:
+            chunks: 每次调用返回一个新的DataFrame分块迭代器的可调用对象
+                    （例如 lambda: pd.read_csv(path, chunksize=10000)），
+                    各分块列一致且按时间顺序排列；也可直接传入DataFrame，按chunk_size切分
+            target_col: 目标变量列名（用于预测）
+            chunk_size: chunks为DataFrame时的分块行数
+        """
+        if isinstance(chunks, pd.DataFrame):
+            df = chunks
+            chunks = lambda: (df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size))
+            
+        k = self.params.n_factors
+        print(f"🔄 流式拟合DFM模型 (n_factors={k})...")
+        
+        # 1. 累积标准化参数
+        self.scaler = StandardScaler()
+        columns = None
+        for chunk in chunks():
+            if columns is None:
+                columns = chunk.columns
+            self.scaler.partial_fit(chunk.to_numpy(dtype=float))
+        if columns is None:
+            raise ValueError("数据源为空")
+            
+        # 2. 增量PCA（首次partial_fit的行数不能少于因子数，过短的分块先缓存）
+        self.pca = IncrementalPCA(n_components=k)
+        pending = []
+        for chunk in chunks():
+            X, _ = self._standardize_chunk(chunk)
+            if not hasattr(self.pca, 'components_') and pending:
+                X = np.vstack(pending + [X])
+            if not hasattr(self.pca, 'components_') and X.shape[0] < k:
+                pending = [X]
+                continue
+            pending = []
+            self.pca.partial_fit(X)
+        if not hasattr(self.pca, 'components_'):
+            raise ValueError(f"样本期数少于因子数量 {k}")
+        self.loadings = self.pca.components_.T
+        
+        # 3. 因子VAR(1)的矩估计（与initialize_params的最小二乘结果一致）
+        S00 = np.zeros((k, k))  # Σ F_{t-1} F_{t-1}'
+        S10 = np.zeros((k, k))  # Σ F_t F_{t-1}'
+        S11 = np.zeros((k, k))  # Σ F_t F_t'
+        sum_lag = np.zeros(k)
+        sum_curr = np.zeros(k)
+        n_pairs = 0
+        last = None
+        for chunk in chunks():
+            X, _ = self._standardize_chunk(chunk)
+            F = self.pca.transform(X)
+            if last is not None:
+                F = np.vstack([last, F])
+            S00 += F[:-1].T @ F[:-1]
+            S10 += F[1:].T @ F[:-1]
+            S11 += F[1:].T @ F[1:]
+            sum_lag += F[:-1].sum(axis=0)
+            sum_curr += F[1:].sum(axis=0)
+            n_pairs += len(F) - 1
+            last = F[-1:]
+        if n_pairs < 2:
+            raise ValueError("样本期数不足，无法估计因子自回归")
+            
+        A = np.linalg.solve(S00.T, S10.T).T
+        # 残差 u_t = F_t - A F_{t-1} 的样本协方差
+        Suu = S11 - A @ S10.T - S10 @ A.T + A @ S00 @ A.T
+        u_mean = (sum_curr - A @ sum_lag) / n_pairs
+        Q = (Suu - n_pairs * np.outer(u_mean, u_mean)) / (n_pairs - 1)
+        
+        self.kalman = KalmanFilterDFM(
+            k, len(columns),
+            steady_state=self.steady_state,
+            update_method='information' if self.kalman_update == 'covariance' else self.kalman_update
+        )
+        self.kalman.A = A
+        self.kalman.C = self.loadings
+        self.kalman.Q = (Q + Q.T) / 2
+        self.kalman.R = np.full(len(columns), 0.1)
+        
+        # 4. 分块卡尔曼滤波
+        sq_error = 0.0
+        n_observed = 0
+        for chunk in chunks():
+            X, missing_mask = self._standardize_chunk(chunk)
+            if self.kalman.filtered_states is None:
+                factors, _ = self.kalman.filter(X, missing_mask)
+            else:
+                factors, _ = self.kalman.update(X, missing_mask)
+            errors = (X - factors @ self.loadings.T)[~missing_mask]
+            sq_error += float(np.sum(errors**2))
+            n_observed += errors.size
+        self.factors = self.kalman.filtered_states
+        
+        if target_col and target_col in columns:
+            self.target_idx = columns.get_loc(target_col)
+            self.target_loading = self.loadings[self.target_idx]
+            
+        # 不保留原始面板，只记录列结构供增量更新使用
+        self.data = None
+        self.released_rows = []
+        self.columns = columns
+        self.target_col = target_col
+        self.rows_since_fit = 0
+        self.fit_error = sq_error / n_observed if n_observed else 0.0
+        
+        print(f"✅ DFM流式拟合完成! ({self.factors.shape[0]}期 x {len(columns)}序列)")
+        print(f"   解释的方差比例: {self.pca.explained_variance_ratio_.sum():.2%}")
+        
+        return self
+    
+    def _estimate_em(self, X_scaled: np.ndarray, missing_mask: np.ndarray):
+        """
+        EM算法估计状态空间参数 Λ、A、Q 及对角阵R
+        
+        E步: 卡尔曼滤波+RTS平滑得到 E[f_t]、Var[f_t] 及一阶滞后协方差
+        (P_t,t-1|T = P_t|T J_t-1')，充分统计量对时间维度做批量einsum求和；
+        M步: 闭式更新，缺失观测不参与对应序列的Λ、R估计
+        """
+        kalman = self.kalman
+        T = X_scaled.shape[0]
+        
+        # 第0期滤波器不吸收观测，M步中同样不使用
+        observed = ~missing_mask
+        observed[0] = False
+        W = observed.astype(float)
+        Y = np.where(observed, X_scaled, 0.0)
+        n_obs = np.maximum(W.sum(axis=0), 1.0)
+        
+        self.em_converged = False
+        for iteration in range(1, self.em_max_iter + 1):
+            # ===== E步 =====
+            kalman.filter(X_scaled, missing_mask)
+            F_s, P_s = kalman.smooth(return_covs=True)
+            J = kalman.smoother_gains
+            
+            Eff = F_s[:, :, None] * F_s[:, None, :] + P_s  # E[f_t f_t'] (T x k x k)
+            S00 = Eff[:-1].sum(axis=0)
+            S11 = Eff[1:].sum(axis=0)
+            S10 = F_s[1:].T @ F_s[:-1] + np.sum(P_s[1:] @ J.transpose(0, 2, 1), axis=0)
+            
+            # ===== M步 =====
+            A = np.linalg.solve(S00.T, S10.T).T
+            Q = (S11 - A @ S10.T) / (T - 1)
+            Q = (Q + Q.T) / 2
+            
+            # 逐序列载荷: λ_i = (Σ_obs y_it f_t')(Σ_obs E[f_t f_t'])⁻¹
+            numer = Y.T @ F_s
+            denom = np.einsum('ti,tkl->ikl', W, Eff)
+            C = np.linalg.solve(denom, numer[:, :, None])[:, :, 0]
+            
+            resid = Y - W * (F_s @ C.T)
+            var_term = np.einsum('ik,tkl,il->ti', C, P_s, C)
+            R_diag = np.sum(resid**2 + W * var_term, axis=0) / n_obs
+            
+            change = np.max(np.abs(C - kalman.C)) / max(np.max(np.abs(kalman.C)), 1e-12)
+            kalman.A, kalman.Q, kalman.C = A, Q, C
+            kalman.R = np.diag(np.maximum(R_diag, 1e-6))
+            
+            if change < self.em_tol:
+                self.em_converged = True
+                break
+                
+        self.em_iterations = iteration
+        status = "收敛" if self.em_converged else "达到迭代上限"
+        print(f"   EM估计{status}: 迭代{iteration}次")
+    
+    def _reconstruction_error(self, X_scaled: np.ndarray, factors: np.ndarray,
+                              missing_mask: np.ndarray) -> float:
+        """观测部分的均方重构误差（标准化尺度）"""
+        errors = (X_scaled - factors @ self.loadings.T)[~missing_mask]
+        return float(np.mean(errors**2)) if errors.size else 0.0
+    
+    def copy(self) -> 'DFMModel':
+        """
+        增量更新用的副本：共享载荷、参数、已有滤波结果与历史面板（只读，不复制历史），
+        标准化器与卡尔曼滤波器各自独立，对副本update()（含重新估计）不影响原模型
+        """
+        model = copy.copy(self)
+        model.scaler = copy.deepcopy(self.scaler)
+        if self.kalman is not None:
+            model.kalman = copy.copy(self.kalman)
+            model.kalman._buffers = dict(self.kalman._buffers)
+        model.released_rows = list(self.released_rows)
+        return model
+    
+    def update(self, new_rows: pd.DataFrame) -> 'DFMModel':
+        """
+        增量更新：新数据发布时冻结标准化参数与因子载荷，
+        仅从最后的滤波状态向前推进卡尔曼滤波，新数据只追加到released_rows，
+        代价为O(新增期数)（滤波结果的缓冲区扩容按倍增摊销）
+        
+        满足update_policy中的条件时自动改为对完整历史重新估计
+        
+        Args:
+            new_rows: 新增观测（列与拟合时一致，可含缺失值）
+            
+        Returns:
+            self
+        """
+        if self.kalman is None:
+            raise ValueError("模型尚未拟合")
+            
+        new_rows = new_rows[self.columns]
+        policy = self.update_policy
+        
+        if policy.max_new_rows is not None and \
+                self.rows_since_fit + len(new_rows) > policy.max_new_rows:
+            if self.data is not None:
+                print(f"🔄 累计新增{self.rows_since_fit + len(new_rows)}期，超过上限，重新估计DFM模型")
+                return self.fit(self._history(new_rows), self.target_col)
+            print(f"⚠️ 累计新增{self.rows_since_fit + len(new_rows)}期，超过上限，"
+                  f"流式拟合的模型需重新调用fit_streaming()")
+            
+        # 使用冻结的标准化参数（缺失值填充为训练均值，滤波时会被掩码忽略）
+        filled = new_rows.fillna(pd.Series(self.scaler.mean_, index=new_rows.columns))
+        X_new = self.scaler.transform(filled)
+        missing_mask = new_rows.isna().values
+        
+        new_factors, _ = self.kalman.update(X_new, missing_mask)
+        
+        error = self._reconstruction_error(X_new, new_factors, missing_mask)
+        if policy.max_error_ratio is not None and self.fit_error and \
+                error > policy.max_error_ratio * self.fit_error:
+            if self.data is not None:
+                print(f"🔄 新增期重构误差{error:.4f}超过样本内误差的{policy.max_error_ratio}倍，重新估计DFM模型")
+                return self.fit(self._history(new_rows), self.target_col)
+            print(f"⚠️ 新增期重构误差{error:.4f}超过样本内误差的{policy.max_error_ratio}倍，"
+                  f"流式拟合的模型需重新调用fit_streaming()")
+            
+        self.factors = self.kalman.filtered_states
+        # 流式拟合的模型不保留历史面板，无法回退到完整重新估计，也无需保留新数据
+        if self.data is not None:
+            self.released_rows.append(new_rows)
+        self.rows_since_fit += len(new_rows)
+        
+        print(f"✅ DFM增量更新完成: 新增{len(new_rows)}期 (重构误差: {error:.4f})")
+        
+        return self
+    
+    def _history(self, new_rows: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """完整历史面板：拟合面板 + 增量追加的各批新数据（仅在重新估计时合并）"""
+        parts = [self.data] + self.released_rows
+        if new_rows is not None:
+            parts.append(new_rows)
+        return pd.concat(parts) if len(parts) > 1 else self.data
+    
+    def _factor_powers(self, horizon: int) -> np.ndarray:
+        """
+        状态转移矩阵的幂 A^0..A^horizon (horizon+1 x k x k)，
+        按A缓存，不同预测期数的请求共用同一组幂
+        """
+        cached = self._A_powers
+        if cached is not None and cached[0] is self.kalman.A and len(cached[1]) > horizon:
+            return cached[1][:horizon + 1]
+            
+        k = self.params.n_factors
+        powers = np.empty((horizon + 1, k, k))
+        powers[0] = np.eye(k)
+        for h in range(1, horizon + 1):
+            powers[h] = self.kalman.A @ powers[h-1]
+        self._A_powers = (self.kalman.A, powers)
+        
+        return powers
+    
+    def forecast(self, horizon: int = 1, full_cov: bool = False) -> Dict[str, np.ndarray]:
+        """
+        批量多步预测：一次计算全部预测期、全部序列的点预测与预测误差协方差
+        
+        - 因子: F_T+h = A^h F_T，P_T+h = A^h P_T A^h' + Σ_{j<h} A^j Q A^j'
+        - 序列: X_T+h = Λ F_T+h，Var = Λ P_T+h Λ' + R
+        结果经拟合时的scaler反标准化到原始尺度
+        
+        Args:
+            horizon: 预测期数
+            full_cov: 是否返回序列间完整协方差 (horizon x N x N)，否则只返回方差
+            
+        Returns:
+            {'factor_mean': (h x k), 'factor_cov': (h x k x k),
+             'mean': (h x N), 'variance': (h x N), 'cov': (h x N x N, 仅full_cov)}
+        """
+        if self.factors is None:
+            raise ValueError("模型尚未拟合")
+        if horizon < 1:
+            raise ValueError(f"预测期数必须为正整数: {horizon}")
+            
+        kalman = self.kalman
+        powers = self._factor_powers(horizon)
+        A_h = powers[1:]
+        
+        factor_mean = A_h @ kalman.filtered_states[-1]
+        # 过程噪声累积项 Σ_{j<h} A^j Q A^j' 对预测期做前缀和
+        noise = np.cumsum(powers[:-1] @ kalman.Q @ powers[:-1].transpose(0, 2, 1), axis=0)
+        factor_cov = A_h @ kalman.filtered_covs[-1] @ A_h.transpose(0, 2, 1) + noise
+        
+        C = self.loadings
+        scale = self.scaler.scale_
+        result = {
+            'factor_mean': factor_mean,
+            'factor_cov': factor_cov,
+            'mean': factor_mean @ C.T * scale + self.scaler.mean_,
+            'variance': (np.einsum('ik,hkl,il->hi', C, factor_cov, C) + kalman.noise_variances()) * scale**2,
+        }
+        if full_cov:
+            result['cov'] = (C @ factor_cov @ C.T + kalman.noise_cov()) * np.outer(scale, scale)
+            
+        return result
+    
     def predict_target(self, steps_ahead: int = 1) -> np.ndarray:
         """
-        预测目标变量
+        预测目标变量（原始尺度）
         
         Args:
             steps_ahead: 预测步数
@@ -266,26 +1000,7 @@ class DFMModel:
         if self.factors is None:
             raise ValueError("模型尚未拟合")
             
-        # 使用最后的状态预测未来因子
-        last_factor = self.factors[-1]
-        predictions = []
-        
-        current_factor = last_factor
-        for _ in range(steps_ahead):
-            # 状态预测: F_{t+1} = A * F_t
-            current_factor = self.kalman.A @ current_factor
-            # 观测预测: y = Λ' * F
-            y_pred = self.target_loading @ current_factor
-            predictions.append(y_pred)
-            
-        # 反标准化
-        predictions = np.array(predictions).reshape(-1, 1)
-        predictions_orig = self.scaler.inverse_transform(
-            np.zeros((steps_ahead, self.loadings.shape[0]))
-        )
-        
-        # 这里简化处理，实际应该只反标准化目标变量
-        return np.array(predictions)
+        return self.forecast(steps_ahead)['mean'][:, self.target_idx]
     
     def get_factor_df(self) -> pd.DataFrame:
         """
@@ -21,6 +21,7 @@ class HybridModelConfig:
     nonlinear_weight: float = 0.4  # 非线性模型权重
     use_residual_approach: bool = True  # 是否使用残差修正方法
     ensemble_method: str = "weighted_sum"  # 集成方法: weighted_sum, stacking, blending
+    error_backtest_length: int = 4  # 估计TSLM残差预测误差时留出回测的期数
 
 
 class HybridPredictor:
@@ -35,6 +36,7 @@ class HybridPredictor:
         self.tslm_adapter = None
         self.meta_learner = None  # 用于stacking
         self.fitted = False
+        self._nonlinear_error_var = None  # TSLM残差预测的单期误差方差（首次使用时回测）
         
         # 历史记录
         self.linear_predictions = []
@@ -51,6 +53,7 @@ class HybridPredictor:
         """
         self.linear_model = linear_model
         self.tslm_adapter = tslm_adapter
+        self._nonlinear_error_var = None
         
     def fit(self, y_train: pd.Series, X_train: Optional[pd.DataFrame] = None):
         """
@@ -61,6 +64,7 @@ class HybridPredictor:
             X_train: 训练特征（可选）
         """
         print("🔄 拟合混合模型...")
+        self._nonlinear_error_var = None
         
         if self.config.ensemble_method == "stacking":
             # 使用stacking方法，训练元学习器
@@ -174,27 +178,90 @@ class HybridPredictor:
         else:
             nonlinear_pred = np.zeros(prediction_length)
             
-        # 集成预测
-        if self.config.ensemble_method == "stacking" and self.meta_learner:
-            meta_features = np.column_stack([
-                linear_pred if isinstance(linear_pred, np.ndarray) else [linear_pred],
-                nonlinear_pred
-            ])
-            final_pred = self.meta_learner.predict(meta_features)
-        else:
-            # 加权平均
-            final_pred = (self.config.linear_weight * 
-                         (linear_pred if isinstance(linear_pred, np.ndarray) else np.array([linear_pred])) +
-                         self.config.nonlinear_weight * nonlinear_pred)
-        
         return {
             'linear_prediction': linear_pred,
             'nonlinear_prediction': nonlinear_pred,
-            'final_prediction': final_pred,
+            'final_prediction': self.combine(linear_pred, nonlinear_pred),
             'linear_weight': self.config.linear_weight,
             'nonlinear_weight': self.config.nonlinear_weight
         }
     
+    def combine(self, linear_pred: np.ndarray, nonlinear_pred: np.ndarray) -> np.ndarray:
+        """
+        集成线性预测与非线性修正（逐期计算）
+        
+        Args:
+            linear_pred: 线性模型预测
+            nonlinear_pred: 非线性残差预测
+            
+        Returns:
+            最终预测
+        """
+        if self.config.ensemble_method == "stacking" and self.meta_learner:
+            meta_features = np.column_stack([
+                linear_pred if isinstance(linear_pred, np.ndarray) else [linear_pred],
+                nonlinear_pred
+            ])
+            return self.meta_learner.predict(meta_features)
+        
+        # 加权平均
+        return (self.config.linear_weight * 
+                (linear_pred if isinstance(linear_pred, np.ndarray) else np.array([linear_pred])) +
+                self.config.nonlinear_weight * nonlinear_pred)
+    
+    def blend_weights(self) -> Tuple[float, float]:
+        """线性部分与非线性修正在最终预测中的权重（stacking时为元学习器系数）"""
+        if self.config.ensemble_method == "stacking" and self.meta_learner:
+            w_linear, w_nonlinear = self.meta_learner.coef_
+            return float(w_linear), float(w_nonlinear)
+        return self.config.linear_weight, self.config.nonlinear_weight
+    
+    def nonlinear_error_variance(self) -> float:
+        """
+        TSLM残差预测的单期误差方差
+        
+        留出残差序列末尾error_backtest_length期，用其余部分做一次TSLM预测，
+        以回测均方误差估计；结果在本次拟合内复用
+        """
+        if self._nonlinear_error_var is None:
+            self._nonlinear_error_var = self._backtest_nonlinear()
+        return self._nonlinear_error_var
+    
+    def _backtest_nonlinear(self) -> float:
+        """回测TSLM残差预测误差"""
+        if not (self.tslm_adapter and self.tslm_adapter.is_initialized
+                and hasattr(self.linear_model, 'residuals')):
+            # 未使用非线性修正（预测为0），不贡献误差
+            return 0.0
+            
+        residuals = np.asarray(self.linear_model.residuals, dtype=float)
+        n_holdout = min(self.config.error_backtest_length, len(residuals) // 4)
+        if n_holdout < 1:
+            return float(np.var(residuals))
+            
+        forecast = self.tslm_adapter.residual_forecast(residuals[:-n_holdout], n_holdout)
+        errors = residuals[-n_holdout:] - forecast
+        return float(np.mean(errors ** 2))
+    
+    def forecast_variance(self, horizon: int = 1) -> np.ndarray:
+        """
+        混合预测的误差方差（解析）
+        
+        σ²(h) = w_lin²·σ²_lin + w_nl²·σ²_nl·h，
+        线性部分是由已观测数据得到的拟合值，取线性模型的一步误差方差（各期相同）；
+        非线性部分是向前的残差预测，取回测的单期误差方差并随预测期累积
+        
+        Args:
+            horizon: 预测期数
+            
+        Returns:
+            各期预测误差方差 (horizon,)
+        """
+        w_linear, w_nonlinear = self.blend_weights()
+        linear_var = self.linear_model.forecast_variance(horizon)
+        nonlinear_var = self.nonlinear_error_variance() * np.arange(1, horizon + 1)
+        return w_linear ** 2 * linear_var + w_nonlinear ** 2 * nonlinear_var
+    
     def nowcast(self, available_data_ratio: float = 1.0) -> Dict[str, float]:
         """
         现时预测（Nowcasting）
@@ -4,10 +4,13 @@ MIDAS (Mixed Data Sampling) 混频数据抽样模型
 """
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
+from scipy.optimize import minimize, least_squares
 from scipy.special import expit
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -43,8 +46,9 @@ class ExponentialAlmonLags:
             归一化权重数组
         """
         k = np.arange(1, n_lags + 1)
-        # 计算未归一化权重
-        unnorm_weights = np.exp(theta1 * k + theta2 * k**2)
+        # 计算未归一化权重（减去最大指数防止溢出，不影响归一化结果）
+        logits = theta1 * k + theta2 * k**2
+        unnorm_weights = np.exp(logits - np.max(logits))
         # 归一化
         weights = unnorm_weights / np.sum(unnorm_weights)
         return weights
@@ -79,14 +83,28 @@ class MIDASModel:
     - m: 频率比（如季度/月度=3）
     """
     
-    def __init__(self, n_lags: int = 12, poly_type: str = 'exp_almon'):
+    # θ参数的L2正则化系数（防止过拟合）
+    reg_lambda = 0.001
+    
+    # θ网格搜索的权重核缓存 {n_lags: (θ网格 (G x 2), 反转权重核 (n_lags x G))}
+    # 类级共享，同一滞后阶数的模型（如集成中的各指标）只需构建一次
+    _theta_grid_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def __init__(self, n_lags: int = 12, poly_type: str = 'exp_almon',
+                 solver: str = 'lbfgs'):
         """
         Args:
             n_lags: 高频滞后阶数
             poly_type: 多项式类型 ('exp_almon')
+            solver: 优化器 ('lbfgs': L-BFGS-B + 解析梯度,
+                    'least_squares': 信赖域最小二乘 + 解析雅可比,
+                    'varpro': 变量投影，β闭式OLS求解，仅对θ做网格搜索+局部优化)
         """
+        if solver not in ('lbfgs', 'least_squares', 'varpro'):
+            raise ValueError(f"不支持的优化器: {solver}")
         self.n_lags = n_lags
         self.poly_type = poly_type
+        self.solver = solver
         self.params: Optional[MIDASParams] = None
         self.weights: Optional[np.ndarray] = None
         self.fitted_values: Optional[np.ndarray] = None
@@ -94,7 +112,28 @@ class MIDASModel:
         
     def _aggregate_high_freq(self, x_high: np.ndarray, weights: np.ndarray) -> np.ndarray:
         """
-    `    使用权重聚合高频数据
+        使用权重聚合高频数据（向量化实现）
+        
+        通过滑动窗口视图（不复制数据）与反转权重做一次矩阵-向量乘积，
+        结果与逐点循环实现 _aggregate_high_freq_loop 一致
+        
+        Args:
+            x_high: 高频数据数组
+            weights: 滞后权重
+            
+        Returns:
+            聚合后的低频数据
+        """
+        x_high = np.asarray(x_high, dtype=float)
+        if len(x_high) < len(weights):
+            # 不足一个完整滞后窗口时没有可聚合的低频观测
+            return np.empty(0)
+        windows = np.lib.stride_tricks.sliding_window_view(x_high, len(weights))
+        return windows @ weights[::-1]
+    
+    def _aggregate_high_freq_loop(self, x_high: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        使用权重聚合高频数据（逐点循环的参考实现，用于校验和基准测试）
         
         Args:
             x_high: 高频数据数组
@@ -147,10 +186,188 @@ class MIDASModel:
         rss = np.sum(residuals**2)
         
         # 添加正则化防止过拟合
-        rss += 0.001 * (theta1**2 + theta2**2)
+        rss += self.reg_lambda * (theta1**2 + theta2**2)
         
         return rss
     
+    def _lagged_terms(self, params: np.ndarray, y_low: np.ndarray,
+                      x_high: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        计算对齐后的目标值、聚合高频数据及其对θ的导数
+        
+        聚合值和两个θ导数共用同一个滑动窗口视图，一次矩阵乘积得到
+        
+        Returns:
+            (对齐后的y, 聚合值x_agg, [dx_agg/dθ1, dx_agg/dθ2] (n x 2))
+        """
+        _, _, theta1, theta2 = params
+        weights = ExponentialAlmonLags.weights(theta1, theta2, self.n_lags)
+        dw_dtheta1, dw_dtheta2 = ExponentialAlmonLags.gradient(theta1, theta2, self.n_lags)
+        
+        windows = np.lib.stride_tricks.sliding_window_view(
+            np.asarray(x_high, dtype=float), self.n_lags
+        )
+        min_len = min(len(y_low), len(windows))
+        
+        kernels = np.column_stack([weights, dw_dtheta1, dw_dtheta2])[::-1]
+        lagged = windows[-min_len:] @ kernels
+        
+        return np.asarray(y_low, dtype=float)[-min_len:], lagged[:, 0], lagged[:, 1:]
+    
+    def _objective_and_gradient(self, params: np.ndarray,
+                                y_low: np.ndarray,
+                                x_high: np.ndarray) -> Tuple[float, np.ndarray]:
+        """
+        目标函数及其解析梯度
+        
+        基于ExponentialAlmonLags.gradient的链式法则:
+        ∂RSS/∂β0 = -2Σe, ∂RSS/∂β1 = -2Σe·x_agg,
+        ∂RSS/∂θj = -2β1Σe·(∂x_agg/∂θj) + 2λθj
+        
+        Args:
+            params: [beta0, beta1, theta1, theta2]
+            y_low: 低频目标变量
+            x_high: 高频解释变量
+            
+        Returns:
+            (正则化残差平方和, 梯度数组)
+        """
+        beta0, beta1, theta1, theta2 = params
+        y, x_agg, dx_dtheta = self._lagged_terms(params, y_low, x_high)
+        
+        residuals = y - (beta0 + beta1 * x_agg)
+        rss = residuals @ residuals + self.reg_lambda * (theta1**2 + theta2**2)
+        
+        grad = np.empty(4)
+        grad[0] = -2 * np.sum(residuals)
+        grad[1] = -2 * residuals @ x_agg
+        grad[2:] = -2 * beta1 * (residuals @ dx_dtheta) + 2 * self.reg_lambda * np.array([theta1, theta2])
+        
+        return rss, grad
+    
+    def _residuals_and_jacobian(self, params: np.ndarray,
+                                y_low: np.ndarray,
+                                x_high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        最小二乘形式的残差向量及雅可比矩阵（用于Gauss-Newton/LM类求解器）
+        
+        残差向量末尾追加 sqrt(λ)·θ 两项，使得 Σr² 与 _objective_function 相等
+        
+        Args:
+            params: [beta0, beta1, theta1, theta2]
+            y_low: 低频目标变量
+            x_high: 高频解释变量
+            
+        Returns:
+            (残差向量 (n+2,), 雅可比矩阵 ∂r/∂params (n+2 x 4))
+        """
+        beta0, beta1, theta1, theta2 = params
+        y, x_agg, dx_dtheta = self._lagged_terms(params, y_low, x_high)
+        n = len(y)
+        sqrt_lambda = np.sqrt(self.reg_lambda)
+        
+        residuals = np.empty(n + 2)
+        residuals[:n] = y - (beta0 + beta1 * x_agg)
+        residuals[n:] = sqrt_lambda * np.array([theta1, theta2])
+        
+        jacobian = np.zeros((n + 2, 4))
+        jacobian[:n, 0] = -1.0
+        jacobian[:n, 1] = -x_agg
+        jacobian[:n, 2:] = -beta1 * dx_dtheta
+        jacobian[n, 2] = sqrt_lambda
+        jacobian[n + 1, 3] = sqrt_lambda
+        
+        return residuals, jacobian
+    
+    @staticmethod
+    def _profile_betas(y: np.ndarray, x_agg: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        给定聚合值，闭式求解β0、β1（简单线性回归OLS）
+        
+        x_agg可以是二维 (n x G)，此时对每一列分别求解
+        
+        Returns:
+            (beta0, beta1)
+        """
+        x_mean = x_agg.mean(axis=0)
+        y_mean = y.mean()
+        x_centered = x_agg - x_mean
+        sxx = np.sum(x_centered**2, axis=0)
+        beta1 = (x_centered.T @ (y - y_mean)) / np.where(sxx > 0, sxx, np.inf)
+        beta0 = y_mean - beta1 * x_mean
+        return beta0, beta1
+    
+    def _profiled_objective(self, theta: np.ndarray,
+                            y_low: np.ndarray,
+                            x_high: np.ndarray) -> Tuple[float, np.ndarray]:
+        """
+        变量投影目标函数: β取当前θ下的OLS解后的RSS及其对θ的梯度
+        
+        由于β在最优点处 ∂RSS/∂β = 0，θ的梯度与完整目标函数中θ分量相同
+        
+        Args:
+            theta: [theta1, theta2]
+            y_low: 低频目标变量
+            x_high: 高频解释变量
+            
+        Returns:
+            (正则化残差平方和, 对θ的梯度)
+        """
+        y, x_agg, dx_dtheta = self._lagged_terms(np.r_[0.0, 0.0, theta], y_low, x_high)
+        beta0, beta1 = self._profile_betas(y, x_agg)
+        
+        residuals = y - (beta0 + beta1 * x_agg)
+        rss = residuals @ residuals + self.reg_lambda * (theta @ theta)
+        grad = -2 * beta1 * (residuals @ dx_dtheta) + 2 * self.reg_lambda * theta
+        
+        return rss, grad
+    
+    def _theta_grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取（并缓存）θ网格及对应的反转权重核
+        
+        Returns:
+            (θ网格 (G x 2), 权重核 (n_lags x G))
+        """
+        if self.n_lags not in self._theta_grid_cache:
+            # θ2乘以k²，在零附近按对数间隔加密
+            theta2_half = np.geomspace(1e-4, 0.5, 20)
+            theta1, theta2 = np.meshgrid(
+                np.linspace(-2, 2, 41),
+                np.concatenate([-theta2_half[::-1], [0.0], theta2_half])
+            )
+            grid = np.column_stack([theta1.ravel(), theta2.ravel()])
+            
+            k = np.arange(1, self.n_lags + 1)
+            logits = np.outer(k, grid[:, 0]) + np.outer(k**2, grid[:, 1])
+            # 减去最大值后再取指数，避免大滞后阶数下溢出
+            unnorm_weights = np.exp(logits - logits.max(axis=0))
+            kernels = (unnorm_weights / unnorm_weights.sum(axis=0))[::-1]
+            
+            self._theta_grid_cache[self.n_lags] = (grid, kernels)
+            
+        return self._theta_grid_cache[self.n_lags]
+    
+    def _grid_search_theta(self, y_low: np.ndarray, x_high: np.ndarray) -> np.ndarray:
+        """
+        在θ网格上一次性评估变量投影目标函数，返回最优网格点
+        """
+        grid, kernels = self._theta_grid()
+        
+        windows = np.lib.stride_tricks.sliding_window_view(
+            np.asarray(x_high, dtype=float), self.n_lags
+        )
+        min_len = min(len(y_low), len(windows))
+        y = np.asarray(y_low, dtype=float)[-min_len:]
+        
+        # 所有网格点的聚合值 (n x G)
+        x_agg = windows[-min_len:] @ kernels
+        beta0, beta1 = self._profile_betas(y, x_agg)
+        residuals = y[:, None] - (beta0 + beta1 * x_agg)
+        rss = np.sum(residuals**2, axis=0) + self.reg_lambda * np.sum(grid**2, axis=1)
+        
+        return grid[np.argmin(rss)]
+    
     def fit(self, y_low: pd.Series, x_high: pd.Series, 
             init_params: Optional[np.ndarray] = None) -> 'MIDASModel':
         """
@@ -169,6 +386,7 @@ class MIDASModel:
         x_values = x_high.values if isinstance(x_high, pd.Series) else x_high
         
         # 默认初始参数
+        user_init_params = init_params
         if init_params is None:
             init_params = np.array([np.mean(y_values), 0.5, -0.1, 0.01])
         
@@ -178,22 +396,59 @@ class MIDASModel:
                   (-2, 2),       # theta1
                   (-0.5, 0.5)]   # theta2
         
-        # 优化
-        result = minimize(
-            fun=self._objective_function,
-            x0=init_params,
-            args=(y_values, x_values),
-            method='L-BFGS-B',
-            bounds=bounds,
-            options={'maxiter': 1000, 'ftol': 1e-8}
-        )
+        # 优化（使用解析梯度/雅可比，避免有限差分的额外目标函数调用）
+        if self.solver == 'varpro':
+            # 变量投影: 仅对θ做二维优化，β由OLS闭式给出
+            if user_init_params is None:
+                theta0 = self._grid_search_theta(y_values, x_values)
+            else:
+                theta0 = np.asarray(init_params[2:], dtype=float)
+            result = minimize(
+                fun=self._profiled_objective,
+                x0=theta0,
+                args=(y_values, x_values),
+                method='L-BFGS-B',
+                jac=True,
+                bounds=bounds[2:],
+                options={'maxiter': 1000, 'ftol': 1e-10}
+            )
+            y_trim, x_agg, _ = self._lagged_terms(np.r_[0.0, 0.0, result.x], y_values, x_values)
+            beta0, beta1 = self._profile_betas(y_trim, x_agg)
+            params_opt = np.r_[beta0, beta1, result.x]
+            rss = result.fun
+        elif self.solver == 'least_squares':
+            lower = [-np.inf if lo is None else lo for lo, _ in bounds]
+            upper = [np.inf if hi is None else hi for _, hi in bounds]
+            result = least_squares(
+                fun=lambda p: self._residuals_and_jacobian(p, y_values, x_values)[0],
+                x0=init_params,
+                jac=lambda p: self._residuals_and_jacobian(p, y_values, x_values)[1],
+                bounds=(lower, upper),
+                method='trf',
+                ftol=1e-10,
+                max_nfev=1000
+            )
+            params_opt = result.x
+            rss = 2 * result.cost
+        else:
+            result = minimize(
+                fun=self._objective_and_gradient,
+                x0=init_params,
+                args=(y_values, x_values),
+                method='L-BFGS-B',
+                jac=True,
+                bounds=bounds,
+                options={'maxiter': 1000, 'ftol': 1e-8}
+            )
+            params_opt = result.x
+            rss = result.fun
         
         if result.success:
             self.params = MIDASParams(
-                beta0=result.x[0],
-                beta1=result.x[1],
-                theta1=result.x[2],
-                theta2=result.x[3]
+                beta0=params_opt[0],
+                beta1=params_opt[1],
+                theta1=params_opt[2],
+                theta2=params_opt[3]
             )
             self.weights = ExponentialAlmonLags.weights(
                 self.params.theta1, self.params.theta2, self.n_lags
@@ -211,7 +466,7 @@ class MIDASModel:
             print(f"✅ MIDAS模型拟合成功!")
             print(f"   参数: beta0={self.params.beta0:.4f}, beta1={self.params.beta1:.4f}")
             print(f"   参数: theta1={self.params.theta1:.4f}, theta2={self.params.theta2:.4f}")
-            print(f"   RSS: {result.fun:.4f}")
+            print(f"   RSS: {rss:.4f}")
         else:
             print(f"❌ 优化失败: {result.message}")
             
@@ -241,6 +496,26 @@ class MIDASModel:
         
         return predictions[-horizon:]
     
+    def forecast_variance(self, horizon: int = 1) -> np.ndarray:
+        """
+        预测误差方差（解析）：以残差方差 RSS/(n-4) 作为各期预测误差方差，
+        无需自助法或蒙特卡洛模拟
+        
+        predict()返回的各期都是由已观测高频数据得到的拟合/现时预测值（一步），
+        因此各期方差相同，不随预测期数累积
+        
+        Args:
+            horizon: 预测期数
+            
+        Returns:
+            各期预测误差方差 (horizon,)
+        """
+        if self.residuals is None:
+            raise ValueError("模型尚未拟合，请先调用fit()")
+            
+        dof = max(len(self.residuals) - 4, 1)  # beta0, beta1, theta1, theta2
+        return np.full(horizon, self.residuals @ self.residuals / dof)
+    
     def nowcast(self, x_high: pd.Series, 
                 available_data_ratio: float = 1.0) -> float:
         """
@@ -299,35 +574,113 @@ class MIDASModel:
         return summary
 
 
+# 进程池工作进程中共享的低频目标数组（由_attach_shared_y_low设置）
+_shared_y_low: Optional[np.ndarray] = None
+_shared_y_low_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach_shared_y_low(shm_name: str, shape: Tuple[int, ...], dtype: str):
+    """进程池初始化函数：挂载主进程创建的共享内存"""
+    global _shared_y_low, _shared_y_low_shm
+    _shared_y_low_shm = shared_memory.SharedMemory(name=shm_name)
+    _shared_y_low = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_shared_y_low_shm.buf)
+
+
+def _fit_ensemble_member(name: str, y_low: np.ndarray, x_high: pd.Series,
+                         n_lags: int, solver: str) -> Tuple[str, 'MIDASModel', float]:
+    """拟合单个集成子模型，返回 (名称, 模型, 耗时秒数)"""
+    print(f"\n📊 拟合MIDAS模型: {name}")
+    start = time.perf_counter()
+    model = MIDASModel(n_lags=n_lags, solver=solver)
+    model.fit(y_low, x_high)
+    return name, model, time.perf_counter() - start
+
+
+def _fit_ensemble_member_shared(name: str, x_high: pd.Series,
+                                n_lags: int, solver: str) -> Tuple[str, 'MIDASModel', float]:
+    """进程池任务：使用共享内存中的低频目标拟合子模型"""
+    return _fit_ensemble_member(name, _shared_y_low, x_high, n_lags, solver)
+
+
 class MIDASEnsemble:
     """
     MIDAS模型集成
     使用多个高频指标构建集成预测
     """
     
-    def __init__(self, n_lags: int = 12):
+    def __init__(self, n_lags: int = 12, solver: str = 'lbfgs'):
+        """
+        Args:
+            n_lags: 高频滞后阶数
+            solver: 子模型优化器（见MIDASModel，批量重训练时推荐'varpro'）
+        """
         self.n_lags = n_lags
+        self.solver = solver
         self.models: Dict[str, MIDASModel] = {}
         self.weights: Dict[str, float] = {}
+        self.fit_times: Dict[str, float] = {}  # 各子模型拟合耗时（秒）
         
     def add_model(self, name: str, model: MIDASModel, weight: float = 1.0):
         """添加子模型"""
         self.models[name] = model
         self.weights[name] = weight
         
-    def fit(self, y_low: pd.Series, x_high_dict: Dict[str, pd.Series]):
+    def fit(self, y_low: pd.Series, x_high_dict: Dict[str, pd.Series],
+            executor: Optional[str] = None, max_workers: Optional[int] = None):
         """
         拟合所有子模型
         
         Args:
             y_low: 低频目标变量
             x_high_dict: 高频变量字典 {名称: 序列}
+            executor: 并行方式 (None: 串行, 'thread': 线程池，适合NumPy密集型计算,
+                      'process': 进程池，适合Python开销较大的优化器)
+            max_workers: 并行工作数（默认由执行器决定）
         """
-        for name, x_high in x_high_dict.items():
-            print(f"\n📊 拟合MIDAS模型: {name}")
-            model = MIDASModel(n_lags=self.n_lags)
-            model.fit(y_low, x_high)
+        if executor not in (None, 'thread', 'process'):
+            raise ValueError(f"不支持的执行器: {executor}")
+            
+        y_values = np.ascontiguousarray(y_low.values if isinstance(y_low, pd.Series) else y_low,
+                                        dtype=float)
+        
+        if executor == 'thread':
+            # 线程共享同一个y数组，无需复制
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [
+                    pool.submit(_fit_ensemble_member, name, y_values, x_high,
+                                self.n_lags, self.solver)
+                    for name, x_high in x_high_dict.items()
+                ]
+                results = [f.result() for f in futures]
+        elif executor == 'process':
+            # 进程通过共享内存访问y数组，避免每个任务序列化一份副本
+            shm = shared_memory.SharedMemory(create=True, size=max(y_values.nbytes, 1))
+            try:
+                np.ndarray(y_values.shape, dtype=y_values.dtype, buffer=shm.buf)[:] = y_values
+                with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_attach_shared_y_low,
+                    initargs=(shm.name, y_values.shape, y_values.dtype.str)
+                ) as pool:
+                    futures = [
+                        pool.submit(_fit_ensemble_member_shared, name, x_high,
+                                    self.n_lags, self.solver)
+                        for name, x_high in x_high_dict.items()
+                    ]
+                    results = [f.result() for f in futures]
+            finally:
+                shm.close()
+                shm.unlink()
+        else:
+            results = [
+                _fit_ensemble_member(name, y_values, x_high, self.n_lags, self.solver)
+                for name, x_high in x_high_dict.items()
+            ]
+        
+        # 按x_high_dict的顺序汇总结果，保证权重归一化与完成顺序无关
+        for name, model, elapsed in results:
             self.models[name] = model
+            self.fit_times[name] = elapsed
             
             # 根据模型拟合优度设置权重
             if model.residuals is not None:
@@ -339,6 +692,7 @@ class MIDASEnsemble:
         self.weights = {k: v / total_weight for k, v in self.weights.items()}
         
         print(f"\n✅ 集成模型权重: {self.weights}")
+        print(f"   各模型拟合耗时(秒): {self.fit_times}")
         
     def predict(self, x_high_dict: Dict[str, pd.Series]) -> float:
         """
@@ -357,6 +711,224 @@ class MIDASEnsemble:
         return np.average(predictions, weights=weights)
 
 
+class BatchMIDASModel:
+    """
+    批量MIDAS模型
+    对同一设定下的多组 (y_low, x_high)（如多个省份×指标）一次性拟合
+    
+    采用变量投影: β对每条序列闭式求解，所有序列的θ拼接后只调用一次
+    L-BFGS-B，目标函数与梯度基于预计算的充分统计量在一次批量NumPy计算中得到
+    """
+    
+    def __init__(self, n_lags: int = 12):
+        """
+        Args:
+            n_lags: 高频滞后阶数
+        """
+        self.n_lags = n_lags
+        self.params: Optional[List[MIDASParams]] = None
+        self.weights: Optional[np.ndarray] = None  # (N x n_lags)
+        self.fitted_values: Optional[np.ndarray] = None  # (N x n)
+        self.residuals: Optional[np.ndarray] = None  # (N x n)
+        
+    def _prepare(self, y_low: np.ndarray, x_high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        对齐低频目标与高频滑动窗口
+        
+        Returns:
+            (y (N x n), 滑动窗口 (N x n x n_lags))
+        """
+        y_low = np.atleast_2d(np.asarray(y_low, dtype=float))
+        x_high = np.atleast_2d(np.asarray(x_high, dtype=float))
+        if y_low.shape[0] != x_high.shape[0]:
+            raise ValueError(f"序列数量不一致: y_low={y_low.shape[0]}, x_high={x_high.shape[0]}")
+            
+        windows = np.lib.stride_tricks.sliding_window_view(x_high, self.n_lags, axis=1)
+        min_len = min(y_low.shape[1], windows.shape[1])
+        return y_low[:, -min_len:], windows[:, -min_len:]
+    
+    @staticmethod
+    def _sufficient_stats(y: np.ndarray, windows: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        预计算每条序列的充分统计量
+        
+        聚合值 x_agg = W·k(θ) 对θ而言是线性的，因此残差平方和、OLS系数及梯度
+        都只依赖于中心化窗口的Gram矩阵和交叉项，优化过程中每次评估的代价为
+        O(N·n_lags²)，与序列长度无关
+        
+        Returns:
+            {'y_mean': (N,), 'syy': (N,), 'w_mean': (N x L), 'gram': (N x L x L), 'cross': (N x L)}
+        """
+        y_mean = y.mean(axis=1)
+        y_centered = y - y_mean[:, None]
+        w_mean = windows.mean(axis=1)
+        w_centered = windows - w_mean[:, None, :]
+        
+        return {
+            'y_mean': y_mean,
+            'syy': np.sum(y_centered**2, axis=1),
+            'w_mean': w_mean,
+            'gram': w_centered.transpose(0, 2, 1) @ w_centered,
+            'cross': np.einsum('ntl,nt->nl', w_centered, y_centered),
+        }
+    
+    def _kernels(self, theta: np.ndarray) -> np.ndarray:
+        """
+        批量计算反转后的权重核及其对θ的导数
+        
+        Args:
+            theta: (N x 2)
+            
+        Returns:
+            (N x n_lags x 3)，最后一维依次为 w, dw/dθ1, dw/dθ2
+        """
+        k = np.arange(1, self.n_lags + 1)
+        logits = theta[:, :1] * k + theta[:, 1:] * k**2
+        unnorm_weights = np.exp(logits - logits.max(axis=1, keepdims=True))
+        w = unnorm_weights / unnorm_weights.sum(axis=1, keepdims=True)
+        
+        dw_dtheta1 = w * (k - np.sum(w * k, axis=1, keepdims=True))
+        dw_dtheta2 = w * (k**2 - np.sum(w * k**2, axis=1, keepdims=True))
+        
+        return np.stack([w, dw_dtheta1, dw_dtheta2], axis=2)[:, ::-1]
+    
+    @staticmethod
+    def _profile_betas(stats: Dict[str, np.ndarray],
+                       kernel: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        由充分统计量闭式求解β0、β1
+        
+        Args:
+            stats: _sufficient_stats的结果
+            kernel: 反转权重核 (N x L)
+            
+        Returns:
+            (beta0, beta1, Σx̃ỹ, G·k)
+        """
+        gram_k = np.einsum('nlm,nm->nl', stats['gram'], kernel)
+        sxx = np.sum(kernel * gram_k, axis=1)
+        sxy = np.sum(stats['cross'] * kernel, axis=1)
+        beta1 = sxy / np.where(sxx > 0, sxx, np.inf)
+        beta0 = stats['y_mean'] - beta1 * np.sum(stats['w_mean'] * kernel, axis=1)
+        return beta0, beta1, sxy, gram_k
+    
+    def _profiled_objective(self, theta_flat: np.ndarray,
+                            stats: Dict[str, np.ndarray]) -> Tuple[float, np.ndarray]:
+        """
+        所有序列的变量投影目标函数之和及其梯度（各序列梯度互不耦合）
+        
+        RSS(θ) = Σỹ² - β1·Σx̃ỹ，∂RSS/∂θ = -2β1·(W̃'e)·∂k/∂θ，其中 W̃'e = c - β1·G·k
+        """
+        theta = theta_flat.reshape(-1, 2)
+        kernels = self._kernels(theta)
+        _, beta1, sxy, gram_k = self._profile_betas(stats, kernels[..., 0])
+        
+        reg_lambda = MIDASModel.reg_lambda
+        rss = np.sum(stats['syy'] - beta1 * sxy) + reg_lambda * np.sum(theta**2)
+        
+        w_resid = stats['cross'] - beta1[:, None] * gram_k
+        grad = (-2 * beta1[:, None] * np.einsum('nl,nlk->nk', w_resid, kernels[..., 1:])
+                + 2 * reg_lambda * theta)
+        
+        return rss, grad.ravel()
+    
+    def _grid_search_theta(self, stats: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        所有序列共用缓存的θ网格，一次批量评估后返回各序列最优网格点 (N x 2)
+        """
+        grid, kernels = MIDASModel(n_lags=self.n_lags)._theta_grid()
+        sxy = stats['cross'] @ kernels  # (N x G)
+        sxx = np.sum(kernels * (stats['gram'] @ kernels), axis=1)  # (N x G)
+        rss = (stats['syy'][:, None] - sxy**2 / np.where(sxx > 0, sxx, np.inf)
+               + MIDASModel.reg_lambda * np.sum(grid**2, axis=1))
+        return grid[np.argmin(rss, axis=1)]
+    
+    def fit(self, y_low: np.ndarray, x_high: np.ndarray) -> List[MIDASParams]:
+        """
+        批量拟合
+        
+        Args:
+            y_low: 低频目标变量 (N x T_low)
+            x_high: 高频解释变量 (N x T_high)
+            
+        Returns:
+            每条序列的MIDASParams列表
+        """
+        y, windows = self._prepare(y_low, x_high)
+        n_series = y.shape[0]
+        stats = self._sufficient_stats(y, windows)
+        
+        theta0 = self._grid_search_theta(stats)
+        result = minimize(
+            fun=self._profiled_objective,
+            x0=theta0.ravel(),
+            args=(stats,),
+            method='L-BFGS-B',
+            jac=True,
+            bounds=[(-2, 2), (-0.5, 0.5)] * n_series,
+            options={'maxiter': 1000, 'ftol': 1e-12}
+        )
+        
+        if result.success:
+            theta = result.x.reshape(-1, 2)
+            kernels = self._kernels(theta)
+            beta0, beta1, _, _ = self._profile_betas(stats, kernels[..., 0])
+            x_agg = np.einsum('ntl,nl->nt', windows, kernels[..., 0])
+            
+            self.params = [
+                MIDASParams(beta0=beta0[i], beta1=beta1[i], theta1=theta[i, 0], theta2=theta[i, 1])
+                for i in range(n_series)
+            ]
+            self.weights = kernels[:, ::-1, 0]
+            self.fitted_values = beta0[:, None] + beta1[:, None] * x_agg
+            self.residuals = y - self.fitted_values
+            
+            print(f"✅ 批量MIDAS模型拟合成功! 序列数: {n_series}, 总RSS: {result.fun:.4f}")
+        else:
+            print(f"❌ 批量优化失败: {result.message}")
+            
+        return self.params
+    
+    def predict(self, x_high: np.ndarray, horizon: int = 1) -> np.ndarray:
+        """
+        批量预测
+        
+        Args:
+            x_high: 高频解释变量 (N x T_high)
+            horizon: 预测期数
+            
+        Returns:
+            预测值 (N x horizon)
+        """
+        if self.params is None:
+            raise ValueError("模型尚未拟合，请先调用fit()")
+            
+        x_high = np.atleast_2d(np.asarray(x_high, dtype=float))
+        windows = np.lib.stride_tricks.sliding_window_view(x_high, self.n_lags, axis=1)
+        x_agg = np.einsum('ntl,nl->nt', windows[:, -horizon:], self.weights[:, ::-1])
+        
+        beta0 = np.array([p.beta0 for p in self.params])
+        beta1 = np.array([p.beta1 for p in self.params])
+        return beta0[:, None] + beta1[:, None] * x_agg
+    
+    def to_models(self) -> List[MIDASModel]:
+        """
+        拆分为独立的MIDASModel（便于接入集成模型与预测引擎）
+        """
+        if self.params is None:
+            raise ValueError("模型尚未拟合，请先调用fit()")
+            
+        models = []
+        for i, params in enumerate(self.params):
+            model = MIDASModel(n_lags=self.n_lags, solver='varpro')
+            model.params = params
+            model.weights = self.weights[i].copy()
+            model.fitted_values = self.fitted_values[i].copy()
+            model.residuals = self.residuals[i].copy()
+            models.append(model)
+        return models
+
+
 if __name__ == "__main__":
     # 测试MIDAS模型
     import sys
@@ -0,0 +1,226 @@
+"""
+模拟TSLM大模型及其导出计算图（依赖torch，由tslm_adapter按需导入）
+"""
+import numpy as np
+import torch
+import torch.nn as nn
+from typing import Callable, Optional, Tuple
+from contextlib import nullcontext
+
+from models.tslm.tslm_adapter import TSLMConfig
+
+
+class DecodeStep(nn.Module):
+    """
+    单步解码计算图：编码窗口并由最后隐状态输出两个头的结果，用于TorchScript/ONNX导出
+    
+    输入: window (batch, n_patches, patch_size)
+    输出: (patch_size长度的输出, output_patch_len长度的输出)
+    """
+    
+    def __init__(self, model: 'MockTSLM'):
+        super().__init__()
+        self.model = model
+        
+    def forward(self, window: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        hidden = self.model.encode(window)[:, -1]
+        return self.model.output(hidden), self.model.horizon_output(hidden)
+
+
+class ExportedStep:
+    """
+    已导出的单步解码计算图（TorchScript模块或ONNX Runtime会话）
+    
+    不是nn.Module，挂在MockTSLM上不会进入state_dict
+    """
+    
+    def __init__(self, runner: Callable[[torch.Tensor], Tuple[torch.Tensor, torch.Tensor]],
+                 backend: str):
+        self.runner = runner
+        self.backend = backend
+        
+    def __call__(self, window: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.runner(window)
+    
+    @classmethod
+    def load(cls, path: str, config: TSLMConfig) -> 'ExportedStep':
+        """
+        加载导出文件（.onnx使用ONNX Runtime，其余按TorchScript加载）
+        """
+        if path.endswith('.onnx'):
+            import onnxruntime as ort
+            
+            options = ort.SessionOptions()
+            if config.intra_op_threads:
+                options.intra_op_num_threads = config.intra_op_threads
+            if config.inter_op_threads:
+                options.inter_op_num_threads = config.inter_op_threads
+            session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+            
+            def run_onnx(window: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+                patch_out, horizon_out = session.run(None, {'window': window.cpu().numpy()})
+                return torch.from_numpy(patch_out), torch.from_numpy(horizon_out)
+            
+            return cls(run_onnx, 'onnx')
+            
+        scripted = torch.jit.optimize_for_inference(torch.jit.load(path, map_location=config.device))
+        return cls(scripted, 'torchscript')
+
+
+class MockTSLM(nn.Module):
+    """
+    模拟TSLM大模型（用于demo演示）
+    实际部署时需要替换为真实的TimesFM/Moirai模型
+    """
+    
+    def __init__(self, config: TSLMConfig):
+        super().__init__()
+        if config.decoding not in ('autoregressive', 'single_pass'):
+            raise ValueError(f"不支持的解码方式: {config.decoding}")
+        if config.output_patch_len % config.patch_size:
+            raise ValueError("output_patch_len必须是patch_size的整数倍")
+        self.config = config
+        
+        # 模拟Transformer架构
+        self.embedding = nn.Linear(config.patch_size, 128)
+        
+        # 多层Transformer编码器
+        encoder_layer = nn.TransformerEncoderLayer(
+            d_model=128,
+            nhead=8,
+            dim_feedforward=512,
+            batch_first=True
+        )
+        self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=4)
+        
+        # 输出层
+        self.output = nn.Linear(128, config.patch_size)
+        
+        # 长输出头：single_pass解码时由最后隐状态一次输出output_patch_len个值
+        self.horizon_output = nn.Linear(128, config.output_patch_len)
+        
+        # 导出后端（TorchScript/ONNX），为None时使用eager模式
+        self.exported_step: Optional[ExportedStep] = None
+        
+    def encode(self, x: torch.Tensor,
+               padding_mask: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        编码：Embedding + Transformer，返回隐状态 (batch, seq_len, 128)
+        """
+        x = self.embedding(x)
+        return self.transformer(x, src_key_padding_mask=padding_mask)
+    
+    def forward(self, x: torch.Tensor,
+                padding_mask: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        前向传播
+        
+        Args:
+            x: 输入序列 (batch_size, seq_len, patch_size)
+            padding_mask: 填充掩码 (batch_size, seq_len)，True表示填充的patch
+            
+        Returns:
+            预测序列
+        """
+        # Embedding + Transformer编码
+        x = self.encode(x, padding_mask)  # (batch, seq_len, 128)
+        
+        # 输出
+        x = self.output(x)  # (batch, seq_len, patch_size)
+        
+        return x
+    
+    def _decode(self, patches: torch.Tensor, padding_mask: Optional[torch.Tensor],
+                prediction_length: int) -> torch.Tensor:
+        """
+        解码循环：滚动窗口保存在预分配的设备端缓冲区中，每步把输出写入缓冲区，
+        下一步以切片视图取窗口，循环内不做torch.cat也不拷回主机
+        
+        Args:
+            patches: 分块后的序列 (batch_size, n_patches, patch_size)
+            padding_mask: 填充掩码，窗口滑动时保持不变，各序列窗口内的patch数固定
+            prediction_length: 预测长度
+            
+        Returns:
+            设备端预测张量 (batch_size, prediction_length)
+        """
+        batch, n_patches, patch_size = patches.shape
+        if self.config.decoding == 'single_pass':
+            head, step_len = self.horizon_output, self.config.output_patch_len
+        else:
+            head, step_len = self.output, patch_size
+        step_patches = step_len // patch_size
+        n_steps = -(-prediction_length // step_len)
+        
+        # 导出的计算图不含填充掩码，带填充的批次仍走eager模式
+        exported = self.exported_step if padding_mask is None else None
+        
+        buffer = patches.new_empty((batch, n_patches + n_steps * step_patches, patch_size))
+        buffer[:, :n_patches] = patches
+        for step in range(n_steps):
+            start = step * step_patches
+            window = buffer[:, start:start + n_patches]
+            if exported is not None:
+                out = exported(window)[1 if head is self.horizon_output else 0]
+            else:
+                out = head(self.encode(window, padding_mask)[:, -1])
+            buffer[:, n_patches + start:n_patches + start + step_patches] = \
+                out.view(batch, step_patches, patch_size)
+                
+        return buffer[:, n_patches:].reshape(batch, -1)[:, :prediction_length]
+    
+    def _autocast(self):
+        """bf16_autocast启用时返回bfloat16自动混合精度上下文"""
+        if not self.config.bf16_autocast:
+            return nullcontext()
+        return torch.autocast(next(self.parameters()).device.type, dtype=torch.bfloat16)
+    
+    def predict(self, context: np.ndarray, prediction_length: int) -> np.ndarray:
+        """
+        预测未来值
+        
+        Args:
+            context: 历史序列
+            prediction_length: 预测长度
+            
+        Returns:
+            预测值
+        """
+        self.eval()
+        with torch.no_grad(), self._autocast():
+            # 将序列分块
+            patches = self._create_patches(context)
+            patches_tensor = torch.as_tensor(patches, dtype=torch.float32,
+                                             device=next(self.parameters()).device).unsqueeze(0)
+            
+            # 解码完成后一次性拷回主机
+            return self._decode(patches_tensor, None, prediction_length)[0].cpu().numpy()
+    
+    def predict_batch(self, patches: np.ndarray, padding_mask: np.ndarray,
+                      prediction_length: int) -> np.ndarray:
+        """
+        批量预测：左侧填充对齐的多条序列一起解码，每步一次前向传播
+        
+        Args:
+            patches: 分块后的序列 (batch_size, n_patches, patch_size)，左侧填充
+            padding_mask: 填充掩码 (batch_size, n_patches)，True表示填充的patch
+            prediction_length: 预测长度
+            
+        Returns:
+            预测值 (batch_size, prediction_length)
+        """
+        self.eval()
+        device = next(self.parameters()).device
+        with torch.no_grad(), self._autocast():
+            patches_tensor = torch.as_tensor(patches, dtype=torch.float32, device=device)
+            mask = torch.as_tensor(padding_mask, dtype=torch.bool, device=device) \
+                if np.any(padding_mask) else None
+            
+            return self._decode(patches_tensor, mask, prediction_length).cpu().numpy()
+    
+    def _create_patches(self, series: np.ndarray) -> np.ndarray:
+        """将序列分块"""
+        patch_size = self.config.patch_size
+        n_patches = len(series) // patch_size
+        patches = series[-n_patches * patch_size:].reshape(n_patches, patch_size)
+        return patches
@@ -2,12 +2,17 @@
 TSLM (Time Series Large Model) 时间序列大模型适配器
 支持TimesFM、Moirai等预训练大模型
 """
+import io
+import os
+import hashlib
+import threading
+import time
+import tempfile
 import numpy as np
 import pandas as pd
-import torch
-import torch.nn as nn
 from typing import Dict, List, Tuple, Optional, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from collections import OrderedDict
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -19,93 +24,26 @@ class TSLMConfig:
     context_length: int = 512
     prediction_length: int = 12
     patch_size: int = 32
-    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    batch_size: int = 64  # forecast_batch每次前向传播的序列数
+    decoding: str = "autoregressive"  # autoregressive: 每步输出一个patch; single_pass: 每步由最后隐状态输出output_patch_len个值
+    output_patch_len: int = 128  # single_pass解码每次前向传播输出的长度（patch_size的整数倍）
+    backend: str = "eager"  # 推理后端: eager, torchscript, onnx
+    export_path: Optional[str] = None  # 导出模型路径（文件名附加权重指纹，对应文件存在则直接加载，否则导出）
+    intra_op_threads: Optional[int] = None  # 算子内并行线程数（None使用默认值）
+    inter_op_threads: Optional[int] = None  # 算子间并行线程数（进程内只能在首次并行计算前设置）
+    quantization: Optional[str] = None  # None或'int8'（nn.Linear动态int8量化，仅CPU）
+    bf16_autocast: bool = False  # 推理时启用bfloat16自动混合精度
+    weights_cache_dir: Optional[str] = None  # 模型权重缓存目录（内存映射加载，多进程共享页面）
+    forecast_cache_size: int = 128  # 残差预测LRU缓存条目数（0表示不缓存）
+    device: str = "auto"  # auto: 构建模型时检测CUDA，否则使用CPU
 
 
-class MockTSLM(nn.Module):
-    """
-    模拟TSLM大模型（用于demo演示）
-    实际部署时需要替换为真实的TimesFM/Moirai模型
-    """
-    
-    def __init__(self, config: TSLMConfig):
-        super().__init__()
-        self.config = config
-        
-        # 模拟Transformer架构
-        self.embedding = nn.Linear(config.patch_size, 128)
-        
-        # 多层Transformer编码器
-        encoder_layer = nn.TransformerEncoderLayer(
-            d_model=128,
-            nhead=8,
-            dim_feedforward=512,
-            batch_first=True
-        )
-        self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=4)
-        
-        # 输出层
-        self.output = nn.Linear(128, config.patch_size)
-        
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        """
-        前向传播
-        
-        Args:
-            x: 输入序列 (batch_size, seq_len, patch_size)
-            
-        Returns:
-            预测序列
-        """
-        # Embedding
-        x = self.embedding(x)  # (batch, seq_len, 128)
-        
-        # Transformer编码
-        x = self.transformer(x)  # (batch, seq_len, 128)
-        
-        # 输出
-        x = self.output(x)  # (batch, seq_len, patch_size)
-        
-        return x
-    
-    def predict(self, context: np.ndarray, prediction_length: int) -> np.ndarray:
-        """
-        预测未来值
-        
-        Args:
-            context: 历史序列
-            prediction_length: 预测长度
-            
-        Returns:
-            预测值
-        """
-        self.eval()
-        with torch.no_grad():
-            # 将序列分块
-            patches = self._create_patches(context)
-            patches_tensor = torch.FloatTensor(patches).unsqueeze(0).to(next(self.parameters()).device)
-            
-            # 自回归预测
-            predictions = []
-            current_patches = patches_tensor.clone()
-            
-            for _ in range(prediction_length // self.config.patch_size + 1):
-                output = self.forward(current_patches)
-                last_patch = output[0, -1, :].cpu().numpy()
-                predictions.extend(last_patch)
-                
-                # 滑动窗口更新
-                new_patch = torch.FloatTensor(last_patch).unsqueeze(0).unsqueeze(0).to(next(self.parameters()).device)
-                current_patches = torch.cat([current_patches[:, 1:, :], new_patch], dim=1)
-            
-            return np.array(predictions[:prediction_length])
-    
-    def _create_patches(self, series: np.ndarray) -> np.ndarray:
-        """将序列分块"""
-        patch_size = self.config.patch_size
-        n_patches = len(series) // patch_size
-        patches = series[-n_patches * patch_size:].reshape(n_patches, patch_size)
-        return patches
+def __getattr__(name: str):
+    """模型类依赖torch，首次访问时才导入，避免导入本模块即加载torch"""
+    if name in ('MockTSLM', 'DecodeStep', 'ExportedStep'):
+        from models.tslm import mock_tslm
+        return getattr(mock_tslm, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class TSLMAdapter:
@@ -122,23 +60,248 @@ class TSLMAdapter:
         self.config = config or TSLMConfig()
         self.model = None
         self.is_initialized = False
+        self._use_mock = True
+        
+        # 延迟构建在API线程池中可能被并发触发：双重检查加锁，只构建一次。
+        # 可重入锁：构建过程中quantize/导出后端会再次调用_ensure_model
+        self._build_lock = threading.RLock()
+        self._model_ready = False  # 构建、量化、后端准备全部完成后才置位
+        
+        # 残差预测缓存：键包含输入序列指纹、预测长度与模型版本
+        self.model_version = 0  # 模型权重或推理后端变化时递增
+        self._forecast_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()  # API线程池中可能并发访问
+        self.cache_hits = 0
+        self.cache_misses = 0
         
-    def initialize(self, use_mock: bool = True):
+    def initialize(self, use_mock: bool = True, lazy: bool = False):
         """
         初始化模型
         
         Args:
             use_mock: 是否使用模拟模型（用于demo）
+            lazy: 延迟到首次预测时才导入torch并构建模型
         """
-        if use_mock:
-            print(f"🔄 初始化模拟TSLM模型...")
-            self.model = MockTSLM(self.config)
-            self.model.to(self.config.device)
+        if self.config.backend not in ('eager', 'torchscript', 'onnx'):
+            raise ValueError(f"不支持的推理后端: {self.config.backend}")
+        self._use_mock = use_mock
+        
+        if lazy:
             self.is_initialized = True
-            print(f"✅ 模拟TSLM模型初始化完成 (device: {self.config.device})")
+            print("✅ TSLM适配器就绪（模型将在首次预测时加载）")
+            return
+            
+        self._build_model()
+        
+    @property
+    def is_loaded(self) -> bool:
+        """模型是否已实际构建"""
+        return self._model_ready
+        
+    def _ensure_model(self):
+        """延迟初始化时在首次使用前构建模型"""
+        if not self.is_initialized:
+            raise RuntimeError("模型尚未初始化，请先调用initialize()")
+        if self._model_ready:
+            return
+        with self._build_lock:
+            if self.model is None:
+                self._build_model()
+            
+    def _build_model(self):
+        """导入torch，构建模型并按配置量化、准备导出后端"""
+        import torch
+        
+        with self._build_lock:
+            self._model_ready = False
+            if self.config.device == "auto":
+                self.config.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self._apply_thread_settings()
+            
+            if self._use_mock:
+                print(f"🔄 初始化模拟TSLM模型...")
+                self.model = self._create_mock_model()
+                self.is_initialized = True
+                print(f"✅ 模拟TSLM模型初始化完成 (device: {self.config.device})")
+            else:
+                # 实际部署时加载真实模型
+                self._load_real_model()
+                
+            if self.config.quantization:
+                self.quantize()
+            if self.config.backend != 'eager':
+                self._prepare_backend()
+            self.invalidate_cache()
+            self._model_ready = True
+            
+    def _create_mock_model(self):
+        """
+        构建模拟模型；配置了weights_cache_dir时，权重缓存文件存在则以内存映射方式加载
+        （在meta设备上构建骨架，参数直接指向映射页面，不做随机初始化也不拷贝，
+        多个工作进程共享同一份只读页面），否则随机初始化后写入缓存
+        """
+        import torch
+        from models.tslm.mock_tslm import MockTSLM
+        
+        cache_dir = self.config.weights_cache_dir
+        if not cache_dir:
+            return MockTSLM(self.config).to(self.config.device)
+            
+        path = os.path.join(cache_dir, f"mock_{self.config.model_name}_p{self.config.patch_size}"
+                                       f"_o{self.config.output_patch_len}.pt")
+        if os.path.exists(path):
+            with torch.device('meta'):
+                model = MockTSLM(self.config)
+            state = torch.load(path, mmap=True, weights_only=True, map_location='cpu')
+            model.load_state_dict(state, assign=True)
+            print(f"   从权重缓存加载: {path}")
+            return model.to(self.config.device)
+            
+        model = MockTSLM(self.config)
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发启动的进程读到半写入的缓存
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        os.close(fd)
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+        print(f"   权重已写入缓存: {path}")
+        return model.to(self.config.device)
+            
+    def quantize(self):
+        """
+        动态int8量化：nn.Linear权重量化为int8，激活在推理时按批动态量化，
+        线性层权重内存约减半（注意力输出投影按PyTorch规则保留fp32）
+        """
+        import torch
+        import torch.nn as nn
+        
+        self._ensure_model()
+        if self.config.quantization != 'int8':
+            raise ValueError(f"不支持的量化方式: {self.config.quantization}")
+        if torch.device(self.config.device).type != 'cpu':
+            raise ValueError("动态int8量化仅支持CPU")
+            
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+        if not self._fastpath_compatible():
+            # 部分torch版本的Transformer融合快速路径直接读取Linear.weight张量，
+            # 量化后的Linear不再提供该张量，只能通过公开开关关闭快速路径（进程级）
+            if not hasattr(torch.backends.mha, 'set_fastpath_enabled'):
+                raise RuntimeError("当前torch版本的Transformer快速路径不支持量化模型，且无法关闭")
+            torch.backends.mha.set_fastpath_enabled(False)
+            print("⚠️ Transformer快速路径不支持量化模型，已关闭")
+        self.invalidate_cache()
+        print(f"✅ TSLM模型已动态int8量化")
+        
+    def _fastpath_compatible(self) -> bool:
+        """以一次小规模试推理检测量化后的模型能否在当前torch版本下运行"""
+        try:
+            self.model.predict(np.zeros(self.config.patch_size), 1)
+        except (AttributeError, RuntimeError):
+            return False
+        return True
+        
+    def _apply_thread_settings(self):
+        """
+        设置torch CPU线程数，使API工作进程内的CPU占用可预期
+        """
+        import torch
+        
+        if self.config.intra_op_threads:
+            torch.set_num_threads(self.config.intra_op_threads)
+        if self.config.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.config.inter_op_threads)
+            except RuntimeError as e:
+                # 算子间线程池在进程内首次并行计算后不能再修改
+                print(f"⚠️ 无法设置算子间线程数: {e}")
+                
+    def _prepare_backend(self):
+        """
+        按配置准备导出后端：export_path的文件名附加当前权重的指纹，
+        对应文件已存在（同一份权重导出过）则直接加载，否则先导出再加载，
+        共用export_path的其他适配器/进程权重不同时不会加载彼此的计算图；
+        未配置export_path时导出到本进程独占的临时文件，加载后删除；
+        ONNX Runtime未安装时退回eager模式
+        """
+        suffix = '.onnx' if self.config.backend == 'onnx' else '.pt'
+        path = self.config.export_path
+        if path is not None:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{_state_dict_fingerprint(self.model, self.config)}{ext}"
         else:
-            # 实际部署时加载真实模型
-            self._load_real_model()
+            # 多个工作进程同时启动时不能共用同一路径
+            path = os.path.join(tempfile.gettempdir(),
+                                f"tslm_{self.config.model_name}_{os.getpid()}{suffix}")
+        try:
+            if not os.path.exists(path) or self.config.export_path is None:
+                self.export(path)
+            self.load_exported(path)
+        except ImportError as e:
+            print(f"⚠️ {self.config.backend}后端依赖未安装，使用eager模式: {e}")
+            print("   安装命令: pip install onnx onnxruntime")
+        finally:
+            # 临时导出文件加载后即可删除（TorchScript与ONNX Runtime都会读入内存）
+            if self.config.export_path is None and os.path.exists(path):
+                os.remove(path)
+            
+    def export(self, path: str) -> str:
+        """
+        导出单步解码计算图（.onnx后缀导出为ONNX，否则导出为TorchScript）
+        
+        Args:
+            path: 导出文件路径
+            
+        Returns:
+            导出文件路径
+        """
+        import torch
+        from models.tslm.mock_tslm import DecodeStep
+        
+        self._ensure_model()
+        step = DecodeStep(self.model).eval()
+        n_patches = max(self.config.context_length // self.config.patch_size, 1)
+        example = torch.zeros((1, n_patches, self.config.patch_size), device=self.config.device)
+        
+        print(f"🔄 导出TSLM解码计算图: {path}")
+        # 先写入同目录的临时文件再原子替换，并发读取方不会看到写了一半的文件
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(path)[1])
+        os.close(fd)
+        try:
+            with torch.no_grad():
+                if path.endswith('.onnx'):
+                    import onnx  # noqa: F401  torch.onnx导出依赖onnx库
+                    torch.onnx.export(
+                        step, (example,), tmp_path,
+                        input_names=['window'],
+                        output_names=['patch', 'horizon'],
+                        dynamic_axes={'window': {0: 'batch', 1: 'n_patches'}},
+                        dynamo=False
+                    )
+                else:
+                    torch.jit.trace(step, example).save(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+                
+        return path
+    
+    def load_exported(self, path: str):
+        """
+        加载导出的计算图作为推理后端（无填充的预测走导出后端）
+        
+        Args:
+            path: export()导出的文件路径
+        """
+        from models.tslm.mock_tslm import ExportedStep
+        
+        self._ensure_model()
+        self.model.exported_step = ExportedStep.load(path, self.config)
+        self.invalidate_cache()
+        print(f"✅ TSLM推理后端: {self.model.exported_step.backend} ({path})")
             
     def _load_real_model(self):
         """
@@ -181,13 +344,13 @@ class TSLMAdapter:
             # self.model.load_from_checkpoint("path/to/checkpoint")
             
             print("⚠️ TimesFM模型加载需要预训练权重，当前使用模拟模型")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
             
         except ImportError:
             print("⚠️ timesfm库未安装，使用模拟模型")
             print("   安装命令: pip install timesfm")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
             
     def _load_moirai(self):
@@ -205,13 +368,13 @@ class TSLMAdapter:
             # self.model = MoiraiForecast.load_from_checkpoint("path/to/checkpoint")
             
             print("⚠️ Moirai模型加载需要预训练权重，当前使用模拟模型")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
             
         except ImportError:
             print("⚠️ uni2ts库未安装，使用模拟模型")
             print("   安装命令: pip install uni2ts")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
             
     def _load_chronos(self):
@@ -229,13 +392,13 @@ class TSLMAdapter:
             # self.model = ChronosPipeline.from_pretrained("path/to/model")
             
             print("⚠️ Chronos模型加载需要预训练权重，当前使用模拟模型")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
             
         except ImportError:
             print("⚠️ chronos库未安装，使用模拟模型")
             print("   安装命令: pip install chronos-forecasting")
-            self.model = MockTSLM(self.config)
+            self.model = self._create_mock_model()
             self.is_initialized = True
     
     def forecast(self, series: Union[pd.Series, np.ndarray], 
@@ -250,9 +413,7 @@ class TSLMAdapter:
         Returns:
             预测值数组
         """
-        if not self.is_initialized:
-            raise RuntimeError("模型尚未初始化，请先调用initialize()")
-            
+        self._ensure_model()
         pred_len = prediction_length or self.config.prediction_length
         
         # 转换为numpy数组
@@ -275,18 +436,93 @@ class TSLMAdapter:
         return predictions
     
     def forecast_batch(self, series_list: List[Union[pd.Series, np.ndarray]], 
-                       prediction_length: Optional[int] = None) -> List[np.ndarray]:
+                       prediction_length: Optional[int] = None,
+                       batch_size: Optional[int] = None) -> List[np.ndarray]:
         """
         批量预测
         
+        不同长度的序列按patch数排序后分批，左侧填充到同一patch数并用掩码屏蔽，
+        每批每个自回归步只做一次前向传播；标准化在填充矩阵上向量化完成
+        
         Args:
             series_list: 时间序列列表
             prediction_length: 预测长度
+            batch_size: 每批序列数（默认使用配置值）
             
         Returns:
-            预测结果列表
+            预测结果列表（与输入顺序一致）
         """
-        return [self.forecast(s, prediction_length) for s in series_list]
+        self._ensure_model()
+        if not series_list:
+            return []
+        if not hasattr(self.model, 'predict_batch'):
+            return [self.forecast(s, prediction_length) for s in series_list]
+            
+        pred_len = prediction_length or self.config.prediction_length
+        batch_size = batch_size or self.config.batch_size
+        patch_size = self.config.patch_size
+        
+        arrays = [np.asarray(s.values if isinstance(s, pd.Series) else s, dtype=float)
+                  for s in series_list]
+        lengths = np.array([len(a) for a in arrays])
+        if np.any(lengths < patch_size):
+            raise ValueError(f"序列长度不足一个patch ({patch_size})")
+        n_patches = lengths // patch_size
+        
+        predictions = [None] * len(arrays)
+        order = np.argsort(n_patches, kind='stable')
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            max_len = lengths[idx].max()
+            
+            # 右对齐到同一长度，左侧以NaN填充，逐序列标准化
+            values = np.full((len(idx), max_len), np.nan)
+            for row, i in enumerate(idx):
+                values[row, max_len - lengths[i]:] = arrays[i]
+            mean = np.nanmean(values, axis=1, keepdims=True)
+            std = np.nanstd(values, axis=1, keepdims=True)
+            values = (values - mean) / (std + 1e-8)
+            
+            # 取末尾max_patches个patch，超出各序列patch数的部分作为填充
+            max_patches = n_patches[idx].max()
+            patches = values[:, -max_patches * patch_size:].reshape(len(idx), max_patches, patch_size)
+            padding_mask = np.arange(max_patches)[None, :] < (max_patches - n_patches[idx])[:, None]
+            patches[padding_mask] = 0.0
+            
+            batch_pred = self.model.predict_batch(patches, padding_mask, pred_len) * std + mean
+            for row, i in enumerate(idx):
+                predictions[i] = batch_pred[row]
+                
+        return predictions
+    
+    def invalidate_cache(self):
+        """
+        清空残差预测缓存并递增模型版本（模型重建、量化、更换后端、微调或重训练后调用）
+        """
+        with self._cache_lock:
+            self.model_version += 1
+            self._forecast_cache.clear()
+        
+    def cache_info(self) -> Dict[str, int]:
+        """残差预测缓存统计"""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._forecast_cache),
+            "maxsize": self.config.forecast_cache_size,
+            "model_version": self.model_version
+        }
+    
+    def _cache_key(self, values: np.ndarray) -> Tuple:
+        """
+        残差序列指纹（内容哈希）+ 解码方式 + 模型版本
+        
+        预测长度不进入键：两种解码方式下较短预测都是较长预测的前缀，
+        每个条目只保留已算出的最长预测，较短的请求直接切片
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest = hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+        return (digest, len(values), self.config.decoding, self.model_version)
     
     def residual_forecast(self, residuals: Union[pd.Series, np.ndarray],
                           prediction_length: Optional[int] = None) -> np.ndarray:
@@ -296,6 +532,9 @@ class TSLMAdapter:
         这是TSLM在混合架构中的核心用途：
         预测线性模型未能捕捉的非线性残差
         
+        残差只在线性模型重新拟合时变化，结果按输入指纹缓存（LRU），
+        重复的预测/现时预测请求以及不超过已缓存长度的请求直接返回缓存结果
+        
         Args:
             residuals: 线性模型的残差序列
             prediction_length: 预测长度
@@ -303,12 +542,119 @@ class TSLMAdapter:
         Returns:
             残差预测值
         """
+        self._ensure_model()
+        pred_len = prediction_length or self.config.prediction_length
+        values = residuals.values if isinstance(residuals, pd.Series) else np.asarray(residuals)
+        
+        cache_size = self.config.forecast_cache_size
+        key = self._cache_key(values) if cache_size > 0 else None
+        if key is not None:
+            with self._cache_lock:
+                cached = self._forecast_cache.get(key)
+                if cached is not None and len(cached) >= pred_len:
+                    self._forecast_cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return cached[:pred_len].copy()
+            
         print(f"🔄 TSLM预测非线性残差...")
-        predictions = self.forecast(residuals, prediction_length)
+        predictions = self.forecast(values, pred_len)
         print(f"✅ 残差预测完成，预测长度: {len(predictions)}")
+        
+        if key is not None:
+            with self._cache_lock:
+                self.cache_misses += 1
+                cached = self._forecast_cache.get(key)
+                if cached is None or len(cached) < len(predictions):
+                    self._forecast_cache[key] = predictions.copy()
+                self._forecast_cache.move_to_end(key)
+                if len(self._forecast_cache) > cache_size:
+                    self._forecast_cache.popitem(last=False)
+                
         return predictions
 
 
+def _state_dict_megabytes(model) -> float:
+    """序列化后的模型权重大小（MB）"""
+    import torch
+    
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def _state_dict_fingerprint(model, config: TSLMConfig) -> str:
+    """模型权重与影响计算图的结构参数的指纹（16位十六进制）"""
+    import torch
+    
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    digest = hashlib.blake2b(buffer.getvalue(), digest_size=8)
+    digest.update(repr((config.model_name, config.context_length, config.patch_size,
+                        config.output_patch_len, config.quantization)).encode())
+    return digest.hexdigest()
+
+
+def check_quantization_accuracy(adapter: TSLMAdapter,
+                                series_list: List[Union[pd.Series, np.ndarray]],
+                                prediction_length: Optional[int] = None,
+                                quantization: Optional[str] = 'int8',
+                                bf16_autocast: bool = False) -> Dict[str, float]:
+    """
+    量化精度检查：以adapter当前的fp32模型为基准，复制同一组权重构建量化/bf16模型，
+    对同一组残差序列比较预测误差、权重大小和单条预测耗时
+    
+    Args:
+        adapter: 已初始化的fp32 eager适配器
+        series_list: 残差序列列表
+        prediction_length: 预测长度
+        quantization: 候选模型的量化方式（None表示不量化）
+        bf16_autocast: 候选模型是否启用bf16自动混合精度
+        
+    Returns:
+        误差与性能指标字典
+    """
+    from models.tslm.mock_tslm import MockTSLM
+    
+    adapter._ensure_model()
+    if adapter.config.quantization or adapter.config.bf16_autocast:
+        raise ValueError("基准适配器必须是fp32模型")
+        
+    candidate = TSLMAdapter(replace(adapter.config, quantization=quantization,
+                                    bf16_autocast=bf16_autocast, backend='eager'))
+    candidate.model = MockTSLM(candidate.config).to(adapter.config.device)
+    candidate.model.load_state_dict(adapter.model.state_dict())
+    candidate.is_initialized = True
+    if quantization:
+        candidate.quantize()
+    candidate._model_ready = True
+        
+    results = {}
+    for name, model_adapter in (('fp32', adapter), ('candidate', candidate)):
+        start = time.perf_counter()
+        predictions = np.stack([model_adapter.forecast(s, prediction_length) for s in series_list])
+        results[name] = predictions
+        results[f'{name}_latency_ms'] = (time.perf_counter() - start) * 1000 / len(series_list)
+        
+    errors = results['candidate'] - results['fp32']
+    rmse = float(np.sqrt(np.mean(errors**2)))
+    report = {
+        'max_abs_error': float(np.max(np.abs(errors))),
+        'rmse': rmse,
+        'relative_rmse': rmse / (float(np.std(results['fp32'])) + 1e-12),
+        'fp32_size_mb': _state_dict_megabytes(adapter.model),
+        'candidate_size_mb': _state_dict_megabytes(candidate.model),
+        'fp32_latency_ms': results['fp32_latency_ms'],
+        'candidate_latency_ms': results['candidate_latency_ms'],
+    }
+    
+    print(f"📊 量化精度检查 ({quantization or 'fp32'}{', bf16' if bf16_autocast else ''}): "
+          f"相对RMSE={report['relative_rmse']:.2%}, "
+          f"权重 {report['fp32_size_mb']:.2f}MB -> {report['candidate_size_mb']:.2f}MB, "
+          f"耗时 {report['fp32_latency_ms']:.1f}ms -> {report['candidate_latency_ms']:.1f}ms")
+    
+    return report
+
+
 class TSLMTrainer:
     """
     TSLM微调训练器（使用LoRA等技术）
@@ -344,6 +690,8 @@ class TSLMTrainer:
         for epoch in range(epochs):
             print(f"   Epoch {epoch+1}/{epochs} - 模拟训练...")
             
+        # 模型权重已变化，旧的残差预测缓存失效
+        self.adapter.invalidate_cache()
         print(f"✅ LoRA微调完成")
 
 
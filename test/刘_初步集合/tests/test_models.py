@@ -7,16 +7,22 @@ import numpy as np
 import pandas as pd
 import sys
 import os
+import time
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from data.data_generator import MacroDataGenerator
 from data.data_processor import DataProcessor
-from models.midas.midas_model import MIDASModel
-from models.dfm.dfm_model import DFMModel
-from models.tslm.tslm_adapter import TSLMAdapter, TSLMConfig
+from models.midas.midas_model import MIDASModel, MIDASEnsemble, BatchMIDASModel
+from models.dfm.dfm_model import DFMModel, DFMUpdatePolicy, KalmanFilterDFM
+from models.tslm.tslm_adapter import TSLMAdapter, TSLMConfig, check_quantization_accuracy
 from models.hybrid.hybrid_model import HybridPredictor, HybridModelConfig
+from backend.core.prediction_engine import PredictionEngine
+from backend.core.inference_executor import InferenceExecutor, ExecutorOverloadedError
+from backend.api.request_coalescer import PredictionCoalescer
+from backend.api.response_cache import ResponseCache
+from backend.api import columnar
 
 
 class TestDataGenerator(unittest.TestCase):
@@ -146,6 +152,170 @@ class TestMIDASModel(unittest.TestCase):
         self.assertIn('parameters', summary)
         self.assertIn('goodness_of_fit', summary)
         print(f"✓ MIDAS摘要: RMSE={summary['goodness_of_fit']['rmse']:.2f}")
+    
+    def test_midas_forecast_variance(self):
+        """测试MIDAS解析预测误差方差"""
+        gdp_aligned, elec_aligned = self.processor.align_frequencies(
+            pd.DataFrame(self.gdp), pd.DataFrame(self.electricity), 'Q', 'M'
+        )
+        
+        midas = MIDASModel(n_lags=12)
+        midas.fit(gdp_aligned['gdp_value_clean'], elec_aligned['electricity'])
+        
+        variance = midas.forecast_variance(horizon=3)
+        expected = np.sum(midas.residuals**2) / (len(midas.residuals) - 4)
+        np.testing.assert_allclose(variance, np.full(3, expected))
+        print(f"✓ MIDAS预测标准差: {np.sqrt(variance[0]):.2f}")
+
+
+class TestMIDASAggregation(unittest.TestCase):
+    """测试MIDAS高频聚合（向量化实现 vs 循环实现）"""
+    
+    def test_vectorized_matches_loop(self):
+        """测试向量化聚合与循环聚合结果一致"""
+        rng = np.random.default_rng(0)
+        for n_lags in (3, 12, 66):
+            midas = MIDASModel(n_lags=n_lags)
+            x_high = rng.normal(size=500)
+            weights = rng.random(n_lags)
+            np.testing.assert_allclose(
+                midas._aggregate_high_freq(x_high, weights),
+                midas._aggregate_high_freq_loop(x_high, weights),
+                rtol=1e-12, atol=1e-12
+            )
+        print("✓ 向量化聚合结果与循环实现一致")
+    
+    def test_short_input_returns_empty(self):
+        """测试高频序列短于滞后阶数时返回空结果"""
+        midas = MIDASModel(n_lags=12)
+        weights = np.ones(12)
+        for length in (0, 5, 11):
+            self.assertEqual(midas._aggregate_high_freq(np.ones(length), weights).shape, (0,))
+        np.testing.assert_allclose(midas._aggregate_high_freq(np.ones(12), weights), [12.0])
+        print("✓ 短序列聚合返回空结果")
+    
+    def test_aggregation_benchmark(self):
+        """微基准: 不同滞后阶数和序列长度下的聚合耗时"""
+        rng = np.random.default_rng(1)
+        print("\n   n_lags  length   loop(ms)  vectorized(ms)  speedup")
+        for n_lags in (12, 52, 260):
+            midas = MIDASModel(n_lags=n_lags)
+            weights = rng.random(n_lags)
+            for length in (300, 1200, 6000):
+                x_high = rng.normal(size=length)
+                
+                start = time.perf_counter()
+                for _ in range(5):
+                    expected = midas._aggregate_high_freq_loop(x_high, weights)
+                loop_ms = (time.perf_counter() - start) / 5 * 1000
+                
+                start = time.perf_counter()
+                for _ in range(5):
+                    actual = midas._aggregate_high_freq(x_high, weights)
+                vec_ms = (time.perf_counter() - start) / 5 * 1000
+                
+                np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-12)
+                print(f"   {n_lags:>6}  {length:>6}  {loop_ms:>9.3f}  {vec_ms:>14.3f}  "
+                      f"{loop_ms / max(vec_ms, 1e-9):>6.1f}x")
+
+
+class TestMIDASGradient(unittest.TestCase):
+    """测试MIDAS目标函数的解析梯度与雅可比"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.x_high = rng.normal(10, 2, size=120)
+        self.y_low = 3 + 0.8 * np.convolve(self.x_high, np.ones(12) / 12, 'valid')[-40:] \
+            + rng.normal(0, 0.1, size=40)
+        self.params = np.array([2.5, 0.7, -0.15, 0.02])
+        self.midas = MIDASModel(n_lags=12)
+    
+    def test_gradient_matches_finite_difference(self):
+        """测试解析梯度与数值梯度一致"""
+        from scipy.optimize import approx_fprime
+        rss, grad = self.midas._objective_and_gradient(self.params, self.y_low, self.x_high)
+        numeric = approx_fprime(self.params, self.midas._objective_function, 1e-7,
+                                self.y_low, self.x_high)
+        self.assertAlmostEqual(rss, self.midas._objective_function(self.params, self.y_low, self.x_high))
+        np.testing.assert_allclose(grad, numeric, rtol=1e-4, atol=1e-4)
+        print(f"✓ 解析梯度: {grad}")
+    
+    def test_jacobian_consistent_with_objective(self):
+        """测试最小二乘残差/雅可比与目标函数梯度一致"""
+        residuals, jacobian = self.midas._residuals_and_jacobian(self.params, self.y_low, self.x_high)
+        rss, grad = self.midas._objective_and_gradient(self.params, self.y_low, self.x_high)
+        self.assertAlmostEqual(residuals @ residuals, rss)
+        np.testing.assert_allclose(2 * jacobian.T @ residuals, grad, rtol=1e-10, atol=1e-10)
+        print(f"✓ 雅可比矩阵: {jacobian.shape}")
+    
+    def test_solvers_agree(self):
+        """测试L-BFGS-B与最小二乘求解器收敛到相同参数"""
+        lbfgs = MIDASModel(n_lags=12).fit(self.y_low, self.x_high)
+        lsq = MIDASModel(n_lags=12, solver='least_squares').fit(self.y_low, self.x_high)
+        np.testing.assert_allclose(lbfgs.fitted_values, lsq.fitted_values, rtol=1e-3)
+        print("✓ 两种求解器结果一致")
+    
+    def test_varpro_matches_full_optimizer(self):
+        """测试变量投影估计量与四参数优化结果一致"""
+        lbfgs = MIDASModel(n_lags=12).fit(self.y_low, self.x_high)
+        varpro = MIDASModel(n_lags=12, solver='varpro').fit(self.y_low, self.x_high)
+        
+        params = lambda m: np.array([m.params.beta0, m.params.beta1, m.params.theta1, m.params.theta2])
+        rss_lbfgs = lbfgs._objective_function(params(lbfgs), self.y_low, self.x_high)
+        rss_varpro = varpro._objective_function(params(varpro), self.y_low, self.x_high)
+        self.assertLessEqual(rss_varpro, rss_lbfgs * (1 + 1e-6))
+        self.assertIn(12, MIDASModel._theta_grid_cache)
+        print(f"✓ 变量投影: RSS={rss_varpro:.6f} (L-BFGS-B: {rss_lbfgs:.6f})")
+
+
+class TestMIDASEnsemble(unittest.TestCase):
+    """测试MIDAS集成模型"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.y_low = rng.normal(5, 1, size=40)
+        self.x_high_dict = {f"indicator_{i}": rng.normal(10, 2, size=120) for i in range(4)}
+    
+    def test_parallel_fit_matches_serial(self):
+        """测试线程池/进程池并行拟合与串行结果一致"""
+        serial = MIDASEnsemble(n_lags=12)
+        serial.fit(self.y_low, self.x_high_dict)
+        
+        for executor in ('thread', 'process'):
+            ensemble = MIDASEnsemble(n_lags=12)
+            ensemble.fit(self.y_low, self.x_high_dict, executor=executor, max_workers=2)
+            self.assertEqual(list(ensemble.weights), list(serial.weights))
+            np.testing.assert_allclose(list(ensemble.weights.values()),
+                                       list(serial.weights.values()))
+            self.assertEqual(set(ensemble.fit_times), set(self.x_high_dict))
+        print(f"✓ 并行集成拟合: 权重={serial.weights}")
+
+
+class TestBatchMIDASModel(unittest.TestCase):
+    """测试批量MIDAS模型"""
+    
+    def test_batch_matches_single_fits(self):
+        """测试批量拟合与逐条拟合结果一致"""
+        rng = np.random.default_rng(4)
+        decay = np.exp(-0.2 * np.arange(12))
+        x_high = rng.normal(10, 2, size=(6, 120))
+        y_low = np.stack([
+            3 + 0.8 * np.convolve(x, decay / decay.sum(), 'valid')[-40:] for x in x_high
+        ]) + rng.normal(0, 0.1, size=(6, 40))
+        
+        batch = BatchMIDASModel(n_lags=12)
+        params = batch.fit(y_low, x_high)
+        self.assertEqual(len(params), 6)
+        
+        for i, batch_params in enumerate(params):
+            single = MIDASModel(n_lags=12, solver='varpro').fit(y_low[i], x_high[i])
+            self.assertAlmostEqual(batch_params.beta1, single.params.beta1, places=3)
+            np.testing.assert_allclose(batch.fitted_values[i], single.fitted_values, rtol=1e-4)
+        
+        predictions = batch.predict(x_high, horizon=2)
+        self.assertEqual(predictions.shape, (6, 2))
+        np.testing.assert_allclose(predictions[:, -1], batch.fitted_values[:, -1])
+        print(f"✓ 批量MIDAS拟合: {len(params)}条序列")
 
 
 class TestDFMModel(unittest.TestCase):
@@ -189,6 +359,250 @@ class TestDFMModel(unittest.TestCase):
         summary = dfm.get_model_summary()
         self.assertIn('explained_variance_ratio', summary)
         print(f"✓ DFM摘要: 解释方差={sum(summary['explained_variance_ratio']):.2%}")
+    
+    def test_dfm_incremental_update(self):
+        """测试DFM增量更新与冻结参数下的完整滤波一致，并按策略触发重新估计"""
+        monthly_numeric = self.processed['monthly'].select_dtypes(include=[np.number])
+        history, new_rows = monthly_numeric.iloc[:-6], monthly_numeric.iloc[-6:].copy()
+        new_rows.iloc[-1, :3] = np.nan
+        
+        dfm = DFMModel(n_factors=3, update_policy=DFMUpdatePolicy(max_new_rows=None, max_error_ratio=None))
+        dfm.fit(history)
+        dfm.update(new_rows)
+        self.assertEqual(dfm.factors.shape[0], len(monthly_numeric))
+        self.assertEqual(dfm.rows_since_fit, 6)
+        
+        # 冻结标准化与载荷，对完整面板从头滤波
+        full = pd.concat([history, new_rows])
+        X_full = dfm.scaler.transform(full.fillna(pd.Series(dfm.scaler.mean_, index=full.columns)))
+        kalman = KalmanFilterDFM(3, X_full.shape[1])
+        kalman.A, kalman.C, kalman.Q, kalman.R = dfm.kalman.A, dfm.kalman.C, dfm.kalman.Q, dfm.kalman.R
+        expected, _ = kalman.filter(X_full, full.isna().values)
+        np.testing.assert_allclose(dfm.factors, expected, atol=1e-10)
+        
+        # 逐月发布：新数据与滤波结果只追加，不复制历史
+        stepwise = DFMModel(n_factors=3, update_policy=DFMUpdatePolicy(max_new_rows=None, max_error_ratio=None))
+        stepwise.fit(history)
+        for i in range(len(new_rows)):
+            before = stepwise.factors
+            stepwise.update(new_rows.iloc[i:i + 1])
+            if i > 0:
+                self.assertIs(stepwise.factors.base, before.base)
+            np.testing.assert_array_equal(stepwise.factors[:len(before)], before)
+        self.assertIs(stepwise.data, history)
+        self.assertEqual(len(stepwise.released_rows), len(new_rows))
+        pd.testing.assert_frame_equal(stepwise._history(), full)
+        np.testing.assert_allclose(stepwise.factors, expected, atol=1e-10)
+        
+        refit = DFMModel(n_factors=3, update_policy=DFMUpdatePolicy(max_new_rows=3))
+        refit.fit(history)
+        refit.update(new_rows)
+        self.assertEqual(refit.rows_since_fit, 0)
+        self.assertEqual(len(refit.data), len(monthly_numeric))
+        print(f"✓ DFM增量更新: {dfm.factors.shape}")
+    
+    def test_dfm_pca_backends(self):
+        """测试各SVD后端的解释方差与奇异值一致"""
+        monthly_numeric = self.processed['monthly'].select_dtypes(include=[np.number])
+        
+        reference = DFMModel(n_factors=3, pca_backend='full').fit(monthly_numeric).get_model_summary()
+        # 增量PCA在批次间截断，结果为近似值
+        for backend, rtol in (('randomized', 1e-6), ('arpack', 1e-6), ('incremental', 0.05)):
+            summary = DFMModel(n_factors=3, pca_backend=backend).fit(monthly_numeric).get_model_summary()
+            np.testing.assert_allclose(summary['explained_variance_ratio'],
+                                       reference['explained_variance_ratio'], rtol=rtol)
+            np.testing.assert_allclose(summary['singular_values'],
+                                       reference['singular_values'], rtol=rtol)
+        
+        dfm = DFMModel(n_factors=3)
+        self.assertEqual(dfm._select_pca_backend((120, 9)), 'full')
+        self.assertEqual(dfm._select_pca_backend((5000, 2000)), 'randomized')
+        print("✓ DFM各SVD后端结果一致")
+    
+    def test_dfm_fit_streaming(self):
+        """测试流式拟合：单块与fit()一致，多块近似且支持缺失值与增量更新"""
+        monthly_numeric = self.processed['monthly'].select_dtypes(include=[np.number])
+        
+        reference = DFMModel(n_factors=3, pca_backend='full').fit(monthly_numeric)
+        single = DFMModel(n_factors=3).fit_streaming(monthly_numeric, chunk_size=len(monthly_numeric))
+        np.testing.assert_allclose(single.loadings, reference.loadings, atol=1e-10)
+        np.testing.assert_allclose(single.kalman.A, reference.kalman.A, atol=1e-10)
+        np.testing.assert_allclose(single.kalman.Q, reference.kalman.Q, atol=1e-10)
+        np.testing.assert_allclose(single.factors, reference.factors, atol=1e-8)
+        
+        # 数据源以可调用对象给出，分块中含末端缺失
+        ragged = monthly_numeric.copy()
+        ragged.iloc[-2:, :4] = np.nan
+        source = lambda: (ragged.iloc[i:i + 25] for i in range(0, len(ragged), 25))
+        dfm = DFMModel(n_factors=3).fit_streaming(source, target_col=ragged.columns[0])
+        self.assertIsNone(dfm.data)
+        self.assertEqual(dfm.factors.shape, (len(ragged), 3))
+        self.assertIsNotNone(dfm.target_loading)
+        np.testing.assert_allclose(dfm.pca.explained_variance_ratio_,
+                                   reference.pca.explained_variance_ratio_, rtol=0.05)
+        
+        dfm.update(monthly_numeric.iloc[-3:])
+        self.assertEqual(dfm.factors.shape[0], len(ragged) + 3)
+        
+        # R以方差向量存储，稳态Riccati方程在全部分块中只求解一次
+        from unittest import mock
+        from scipy.linalg import solve_discrete_are
+        import models.dfm.dfm_model as dfm_module
+        with mock.patch.object(dfm_module, 'solve_discrete_are', wraps=solve_discrete_are) as dare:
+            steady = DFMModel(n_factors=3, steady_state=True).fit_streaming(source)
+        self.assertEqual(dare.call_count, 1)
+        self.assertEqual(steady.kalman.R.shape, (len(ragged.columns),))
+        self.assertEqual(steady.kalman.update_method, 'information')
+        np.testing.assert_allclose(steady.factors, DFMModel(n_factors=3).fit_streaming(source).factors,
+                                   atol=1e-6)
+        
+        # 对角R的k x k等价方程与完整方程的稳态解一致
+        kalman = steady.kalman
+        P_pred_ss = solve_discrete_are(kalman.A.T, kalman.C.T, kalman.Q, kalman.noise_cov())
+        np.testing.assert_allclose(kalman._steady_state_gain()[0], P_pred_ss, atol=1e-8)
+        print(f"✓ DFM流式拟合: {dfm.factors.shape}")
+    
+    def test_dfm_forecast(self):
+        """测试批量多步预测与逐期递推一致，且正确反标准化"""
+        monthly_numeric = self.processed['monthly'].select_dtypes(include=[np.number])
+        target = monthly_numeric.columns[0]
+        dfm = DFMModel(n_factors=3).fit(monthly_numeric, target_col=target)
+        kalman = dfm.kalman
+        
+        horizon = 6
+        forecast = dfm.forecast(horizon, full_cov=True)
+        
+        f, P = kalman.filtered_states[-1], kalman.filtered_covs[-1]
+        for h in range(horizon):
+            f = kalman.A @ f
+            P = kalman.A @ P @ kalman.A.T + kalman.Q
+            np.testing.assert_allclose(forecast['factor_mean'][h], f, atol=1e-10)
+            np.testing.assert_allclose(forecast['factor_cov'][h], P, atol=1e-10)
+            
+            x = dfm.scaler.inverse_transform((dfm.loadings @ f)[None, :])[0]
+            cov = (dfm.loadings @ P @ dfm.loadings.T + kalman.R) * np.outer(dfm.scaler.scale_, dfm.scaler.scale_)
+            np.testing.assert_allclose(forecast['mean'][h], x, atol=1e-8)
+            np.testing.assert_allclose(forecast['cov'][h], cov, atol=1e-8)
+            np.testing.assert_allclose(forecast['variance'][h], np.diag(cov), atol=1e-8)
+            
+        np.testing.assert_allclose(dfm.predict_target(horizon), forecast['mean'][:, 0])
+        # 较短预测期复用已缓存的A的幂
+        np.testing.assert_allclose(dfm.forecast(2)['mean'], forecast['mean'][:2])
+        print(f"✓ DFM批量预测: {forecast['mean'].shape}")
+
+
+class TestKalmanFilterDFM(unittest.TestCase):
+    """测试DFM卡尔曼滤波器"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        T, self.n_series, self.n_factors = 400, 20, 3
+        A = np.diag([0.9, 0.7, 0.5])
+        factors = np.zeros((T, self.n_factors))
+        for t in range(1, T):
+            factors[t] = A @ factors[t-1] + rng.normal(0, 0.5, self.n_factors)
+        self.loadings = rng.normal(size=(self.n_series, self.n_factors))
+        self.factors = factors
+        self.observations = factors @ self.loadings.T + rng.normal(0, 0.3, (T, self.n_series))
+        
+        # 末端参差不齐（Ragged Edge）+ 中间零星缺失
+        self.missing_mask = np.zeros_like(self.observations, dtype=bool)
+        self.missing_mask[-3:, :8] = True
+        self.missing_mask[150, 4] = True
+        self.observations[self.missing_mask] = np.nan
+    
+    def _make_filter(self, **kwargs) -> KalmanFilterDFM:
+        kalman = KalmanFilterDFM(self.n_factors, self.n_series, **kwargs)
+        kalman.initialize_params(self.factors, self.loadings)
+        return kalman
+    
+    def test_steady_state_matches_time_varying(self):
+        """测试稳态增益滤波与时变滤波结果一致"""
+        states, covs = self._make_filter().filter(self.observations, self.missing_mask)
+        states_ss, covs_ss = self._make_filter(steady_state=True).filter(
+            self.observations, self.missing_mask
+        )
+        np.testing.assert_allclose(states_ss, states, atol=1e-8)
+        np.testing.assert_allclose(covs_ss, covs, atol=1e-8)
+        print("✓ 稳态卡尔曼增益与时变滤波一致")
+    
+    def test_information_form_matches_covariance_form(self):
+        """测试信息形式（Woodbury）更新与标准协方差形式一致"""
+        states, covs = self._make_filter().filter(self.observations, self.missing_mask)
+        states_info, covs_info = self._make_filter(update_method='information').filter(
+            self.observations, self.missing_mask
+        )
+        np.testing.assert_allclose(states_info, states, atol=1e-8)
+        np.testing.assert_allclose(covs_info, covs, atol=1e-8)
+        
+        kalman = self._make_filter(update_method='information')
+        kalman.R = kalman.R + 0.01
+        with self.assertRaises(ValueError):
+            kalman.filter(self.observations, self.missing_mask)
+        print("✓ 信息形式卡尔曼更新与协方差形式一致")
+    
+    def test_univariate_matches_covariance_form(self):
+        """测试单变量顺序处理与标准协方差形式一致（含大量缺失）"""
+        rng = np.random.default_rng(6)
+        missing_mask = self.missing_mask | (rng.random(self.missing_mask.shape) < 0.4)
+        missing_mask[200] = True  # 整期全部缺失
+        
+        states, covs = self._make_filter().filter(self.observations, missing_mask)
+        states_uni, covs_uni = self._make_filter(update_method='univariate').filter(
+            self.observations, missing_mask
+        )
+        np.testing.assert_allclose(states_uni, states, atol=1e-8)
+        np.testing.assert_allclose(covs_uni, covs, atol=1e-8)
+        print("✓ 单变量顺序卡尔曼更新与协方差形式一致")
+    
+    def test_smoother_reuses_predicted_covariances(self):
+        """测试向量化RTS平滑器与逐期求逆实现一致，并支持末端窗口与协方差输出"""
+        kalman = self._make_filter()
+        states, covs = kalman.filter(self.observations, self.missing_mask)
+        
+        expected = states.copy()
+        for t in range(len(states) - 2, -1, -1):
+            P_pred = kalman.A @ covs[t] @ kalman.A.T + kalman.Q
+            J = covs[t] @ kalman.A.T @ np.linalg.inv(P_pred)
+            expected[t] = states[t] + J @ (expected[t+1] - kalman.A @ states[t])
+        
+        # 滤波时存下的Cholesky因子重构预测协方差，平滑增益由其回代求得
+        chols = np.tril(kalman.predicted_cov_chols[1:])
+        np.testing.assert_allclose(chols @ chols.transpose(0, 2, 1), kalman.predicted_covs[1:], atol=1e-12)
+        
+        smoothed, smoothed_covs = kalman.smooth(return_covs=True)
+        np.testing.assert_allclose(smoothed, expected, atol=1e-10)
+        np.testing.assert_allclose(smoothed_covs[-1], covs[-1])
+        self.assertTrue(np.all(np.linalg.eigvalsh(smoothed_covs) > 0))
+        
+        tail = kalman.smooth(window=20)
+        self.assertEqual(tail.shape, (20, self.n_factors))
+        np.testing.assert_allclose(tail, expected[-20:], atol=1e-10)
+        
+        # 增量滤波同样追加新增期的Cholesky因子
+        kalman.update(self.observations[-5:] * 0.5)
+        self.assertEqual(len(kalman.predicted_cov_chols), len(kalman.predicted_covs))
+        self.assertEqual(kalman.smooth(window=10).shape, (10, self.n_factors))
+        print("✓ RTS平滑器（缓存预测协方差）结果一致")
+    
+    def test_dfm_em_estimation(self):
+        """测试EM估计收敛并在迭代预算内停止"""
+        panel = pd.DataFrame(self.observations)
+        
+        dfm = DFMModel(n_factors=3, estimation='em', em_tol=1e-4, em_max_iter=200)
+        dfm.fit(panel)
+        self.assertTrue(dfm.em_converged)
+        R_diag = np.diag(dfm.kalman.R)
+        self.assertTrue(np.all(R_diag > 0))
+        np.testing.assert_allclose(dfm.kalman.R, np.diag(R_diag))
+        self.assertTrue(np.all(np.abs(np.linalg.eigvals(dfm.kalman.A)) < 1))
+        self.assertIs(dfm.loadings, dfm.kalman.C)
+        
+        budget = DFMModel(n_factors=3, estimation='em', em_tol=0, em_max_iter=2)
+        budget.fit(panel)
+        self.assertEqual(budget.em_iterations, 2)
+        self.assertFalse(budget.em_converged)
+        print(f"✓ DFM EM估计: 迭代{dfm.em_iterations}次收敛")
 
 
 class TestTSLMAdapter(unittest.TestCase):
@@ -216,6 +630,227 @@ class TestTSLMAdapter(unittest.TestCase):
         forecast = tslm.forecast(test_series, prediction_length=12)
         self.assertEqual(len(forecast), 12)
         print(f"✓ TSLM预测: {forecast[:3]}...")
+    
+    def test_tslm_forecast_batch(self):
+        """测试填充批量预测与逐条预测一致"""
+        config = TSLMConfig(model_name="timesfm", context_length=128, prediction_length=12, batch_size=8)
+        tslm = TSLMAdapter(config)
+        tslm.initialize(use_mock=True)
+        
+        rng = np.random.default_rng(0)
+        series_list = [pd.Series(rng.normal(size=n)) for n in rng.integers(32, 200, size=20)]
+        
+        batched = tslm.forecast_batch(series_list, prediction_length=40)
+        for series, pred in zip(series_list, batched):
+            np.testing.assert_allclose(pred, tslm.forecast(series, prediction_length=40), atol=1e-4)
+        print(f"✓ TSLM批量预测: {len(batched)}条序列")
+    
+    def test_tslm_decoding_modes(self):
+        """测试预分配缓冲区解码与逐步拼接结果一致，single_pass每个输出块只前向一次"""
+        import torch
+        config = TSLMConfig(model_name="timesfm", context_length=128, prediction_length=12)
+        tslm = TSLMAdapter(config)
+        tslm.initialize(use_mock=True)
+        model = tslm.model
+        
+        context = np.random.default_rng(1).normal(size=256)
+        patches = torch.FloatTensor(model._create_patches(context)).unsqueeze(0)
+        expected = []
+        model.eval()
+        with torch.no_grad():
+            for _ in range(100 // config.patch_size + 1):
+                last_patch = model(patches)[:, -1:, :]
+                expected.extend(last_patch[0, 0].numpy())
+                patches = torch.cat([patches[:, 1:, :], last_patch], dim=1)
+        np.testing.assert_allclose(model.predict(context, 100), expected[:100], atol=1e-5)
+        
+        calls = []
+        hook = model.transformer.register_forward_hook(lambda *args: calls.append(1))
+        config.decoding = 'single_pass'
+        self.assertEqual(len(model.predict(context, config.output_patch_len)), config.output_patch_len)
+        self.assertEqual(len(calls), 1)
+        model.predict(context, 3 * config.output_patch_len)
+        self.assertEqual(len(calls), 4)
+        hook.remove()
+        print("✓ TSLM解码模式")
+    
+    def test_tslm_torchscript_backend(self):
+        """测试TorchScript导出后端与eager模式结果一致"""
+        import dataclasses
+        import tempfile
+        import torch
+        context = np.random.default_rng(2).normal(size=256)
+        n_threads = torch.get_num_threads()
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            config = TSLMConfig(context_length=256, backend='torchscript', intra_op_threads=1,
+                                export_path=os.path.join(tmp, 'tslm.pt'),
+                                weights_cache_dir=os.path.join(tmp, 'weights'))
+            tslm = TSLMAdapter(config)
+            tslm.initialize(use_mock=True)
+            self.assertEqual(tslm.model.exported_step.backend, 'torchscript')
+            exports = [name for name in os.listdir(tmp) if name.endswith('.pt')]
+            self.assertEqual(len(exports), 1)
+            
+            exported = tslm.forecast(context, prediction_length=48)
+            tslm.model.exported_step = None
+            np.testing.assert_allclose(exported, tslm.forecast(context, prediction_length=48), atol=1e-4)
+            
+            # 同一份权重的导出文件直接复用，不重新导出
+            export_file = os.path.join(tmp, exports[0])
+            mtime = os.path.getmtime(export_file)
+            reused = TSLMAdapter(config)
+            reused.initialize(use_mock=True)
+            self.assertEqual(reused.model.exported_step.backend, 'torchscript')
+            self.assertEqual(os.path.getmtime(export_file), mtime)
+            
+            # 共用export_path但权重不同的适配器导出自己的计算图，而不是加载他人的
+            other = TSLMAdapter(dataclasses.replace(config, weights_cache_dir=None))
+            other.initialize(use_mock=True)
+            self.assertEqual(len([name for name in os.listdir(tmp) if name.endswith('.pt')]), 2)
+            via_graph = other.forecast(context, prediction_length=48)
+            batched = other.forecast_batch([context, context[:200]], prediction_length=48)[0]
+            other.model.exported_step = None
+            eager = other.forecast(context, prediction_length=48)
+            np.testing.assert_allclose(via_graph, eager, atol=1e-4)
+            np.testing.assert_allclose(batched, eager, atol=1e-4)
+            self.assertGreater(np.max(np.abs(eager - exported)), 1e-3)
+        
+        # 未配置路径时导出到本进程独占的临时文件，加载后删除
+        transient = TSLMAdapter(TSLMConfig(context_length=256, backend='torchscript'))
+        transient.initialize(use_mock=True)
+        self.assertEqual(transient.model.exported_step.backend, 'torchscript')
+        self.assertFalse(os.path.exists(os.path.join(
+            tempfile.gettempdir(), f"tslm_timesfm_{os.getpid()}.pt")))
+        self.assertEqual(torch.get_num_threads(), 1)
+        torch.set_num_threads(n_threads)
+        print("✓ TSLM TorchScript后端")
+    
+    def test_tslm_int8_quantization(self):
+        """测试动态int8量化减小权重且残差预测接近fp32基准"""
+        import torch
+        # 快速路径开关是进程级的，测试结束后恢复
+        self.addCleanup(torch.backends.mha.set_fastpath_enabled,
+                        torch.backends.mha.get_fastpath_enabled())
+        config = TSLMConfig(model_name="timesfm", context_length=128, prediction_length=12)
+        tslm = TSLMAdapter(config)
+        tslm.initialize(use_mock=True)
+        
+        rng = np.random.default_rng(3)
+        residuals = [rng.normal(size=n) for n in (48, 96, 160)]
+        report = check_quantization_accuracy(tslm, residuals, prediction_length=12)
+        self.assertLess(report['candidate_size_mb'], 0.6 * report['fp32_size_mb'])
+        self.assertLess(report['relative_rmse'], 0.1)
+        
+        quantized = TSLMAdapter(TSLMConfig(context_length=128, quantization='int8', bf16_autocast=True))
+        quantized.initialize(use_mock=True)
+        self.assertEqual(len(quantized.residual_forecast(residuals[0], 12)), 12)
+        self.assertTrue(quantized._fastpath_compatible())
+        print(f"✓ TSLM int8量化: 相对RMSE={report['relative_rmse']:.2%}")
+    
+    def test_tslm_quantization_fastpath_check(self):
+        """测试仅在量化模型无法走快速路径时才关闭Transformer快速路径"""
+        import torch
+        from unittest import mock
+        self.addCleanup(torch.backends.mha.set_fastpath_enabled,
+                        torch.backends.mha.get_fastpath_enabled())
+        series = np.random.default_rng(5).normal(size=96)
+        
+        for compatible in (True, False):
+            torch.backends.mha.set_fastpath_enabled(True)
+            tslm = TSLMAdapter(TSLMConfig(context_length=128, quantization='int8'))
+            with mock.patch.object(TSLMAdapter, '_fastpath_compatible', return_value=compatible):
+                tslm.initialize(use_mock=True)
+            self.assertEqual(torch.backends.mha.get_fastpath_enabled(), compatible)
+            
+        # 检测不依赖torch私有属性：试推理失败即判定为不兼容
+        with mock.patch.object(tslm.model, 'predict', side_effect=AttributeError):
+            self.assertFalse(tslm._fastpath_compatible())
+        self.assertEqual(len(tslm.forecast(series, 12)), 12)
+        print("✓ TSLM量化快速路径检测")
+    
+    def test_tslm_lazy_init_and_weights_cache(self):
+        """测试延迟构建模型与内存映射权重缓存"""
+        import tempfile
+        series = np.random.default_rng(4).normal(size=200)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            first = TSLMAdapter(TSLMConfig(context_length=128, weights_cache_dir=tmp))
+            first.initialize(use_mock=True, lazy=True)
+            self.assertTrue(first.is_initialized)
+            self.assertFalse(first.is_loaded)
+            expected = first.forecast(series, prediction_length=12)
+            self.assertTrue(first.is_loaded)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+            
+            # 第二个进程/适配器从缓存加载同一份权重
+            second = TSLMAdapter(TSLMConfig(context_length=128, weights_cache_dir=tmp))
+            second.initialize(use_mock=True)
+            np.testing.assert_allclose(second.forecast(series, prediction_length=12), expected, atol=1e-6)
+        print("✓ TSLM延迟加载与权重缓存")
+    
+    def test_tslm_concurrent_lazy_build(self):
+        """测试并发的首次预测只构建一次模型，各线程结果一致"""
+        import threading
+        from unittest import mock
+        adapter = TSLMAdapter(TSLMConfig(context_length=128))
+        adapter.initialize(use_mock=True, lazy=True)
+        series = np.random.default_rng(6).normal(size=200)
+        
+        builds = []
+        original_create = TSLMAdapter._create_mock_model
+        def slow_create(instance):
+            builds.append(threading.get_ident())
+            time.sleep(0.1)
+            return original_create(instance)
+        
+        results = [None] * 4
+        def run(i):
+            results[i] = adapter.forecast(series, prediction_length=8)
+        
+        with mock.patch.object(TSLMAdapter, '_create_mock_model', slow_create):
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        
+        self.assertEqual(len(builds), 1)
+        self.assertTrue(adapter.is_loaded)
+        for result in results[1:]:
+            np.testing.assert_array_equal(result, results[0])
+        print("✓ TSLM并发延迟构建只执行一次")
+    
+    def test_tslm_residual_forecast_cache(self):
+        """测试残差预测LRU缓存的命中、淘汰与失效"""
+        tslm = TSLMAdapter(TSLMConfig(context_length=128, forecast_cache_size=2))
+        tslm.initialize(use_mock=True)
+        
+        rng = np.random.default_rng(5)
+        a, b, c = (rng.normal(size=64) for _ in range(3))
+        first = tslm.residual_forecast(a, 4)
+        np.testing.assert_array_equal(tslm.residual_forecast(pd.Series(a), 4), first)
+        self.assertEqual((tslm.cache_hits, tslm.cache_misses), (1, 1))
+        
+        # 更长的预测替换条目，较短的请求由其前缀命中
+        longer = tslm.residual_forecast(a, 8)
+        np.testing.assert_allclose(longer[:4], first, atol=1e-6)
+        np.testing.assert_array_equal(tslm.residual_forecast(a, 4), longer[:4])
+        self.assertEqual((tslm.cache_hits, tslm.cache_misses), (2, 2))
+        
+        # 容量为2时最久未使用的a被淘汰
+        tslm.residual_forecast(b, 4)
+        tslm.residual_forecast(c, 4)
+        tslm.residual_forecast(a, 4)
+        self.assertEqual(tslm.cache_info()['misses'], 5)
+        self.assertEqual(tslm.cache_info()['size'], 2)
+        
+        tslm.invalidate_cache()
+        tslm.residual_forecast(c, 4)
+        tslm.residual_forecast(c, 4)
+        info = tslm.cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['size']), (3, 6, 1))
+        print(f"✓ TSLM残差预测缓存: {info}")
 
 
 class TestHybridModel(unittest.TestCase):
@@ -283,6 +918,491 @@ class TestHybridModel(unittest.TestCase):
         print(f"✓ 混合模型预测: {prediction['final_prediction'][0]:.2f}")
 
 
+class TestPredictionEngine(unittest.TestCase):
+    """测试预测引擎"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = PredictionEngine()
+        cls.engine.initialize(use_mock_data=True)
+    
+    def test_predict_confidence_interval(self):
+        """测试预测结果附带解析预测区间"""
+        for kwargs in ({'use_hybrid': True}, {'use_hybrid': False}, {'target': 'electricity'}):
+            result = self.engine.predict(horizon=3, **kwargs)
+            interval = result['confidence_interval']
+            final = np.atleast_1d(result['final_prediction'])[-1]
+            self.assertEqual(len(result['prediction_std']), 3)
+            self.assertLess(interval['lower'], final)
+            self.assertGreater(interval['upper'], final)
+            self.assertIn('nonlinear_correction', result)
+            self.assertIn('model_weights', result)
+            
+        # DFM指标的区间宽度来自预测协方差，随预测期数增加而不减
+        std = self.engine.predict('electricity', horizon=4)['prediction_std']
+        expected = np.sqrt(self.engine.dfm_model.forecast(4)['variance'][:,
+                           self.engine.dfm_model.columns.get_loc('electricity')])
+        np.testing.assert_allclose(std, expected)
+        self.assertTrue(np.all(np.diff(std) >= -1e-12))
+        
+        # 混合预测按权重合成线性与TSLM残差误差方差，区间随预测期数变宽
+        hybrid = self.engine.hybrid_predictor
+        w_linear, w_nonlinear = hybrid.blend_weights()
+        std = self.engine.predict(horizon=4)['prediction_std']
+        expected = np.sqrt(w_linear ** 2 * self.engine.midas_model.forecast_variance(4)
+                           + w_nonlinear ** 2 * hybrid.nonlinear_error_variance() * np.arange(1, 5))
+        np.testing.assert_allclose(std, expected)
+        self.assertGreater(hybrid.nonlinear_error_variance(), 0)
+        self.assertTrue(np.all(np.diff(std) > 0))
+        
+        # 仅线性模型时各期都是拟合值，点预测不随预测期数变化，区间也不变
+        short = self.engine.predict(horizon=1, use_hybrid=False)
+        long = self.engine.predict(horizon=4, use_hybrid=False)
+        self.assertEqual(np.atleast_1d(short['final_prediction'])[-1],
+                         np.atleast_1d(long['final_prediction'])[-1])
+        self.assertEqual(short['confidence_interval'], long['confidence_interval'])
+        print(f"✓ 预测区间: {interval}")
+    
+    def test_nowcast_targets(self):
+        """测试GDP与DFM月度指标的现时预测"""
+        for target in ('gdp', 'electricity'):
+            result = self.engine.nowcast(target)
+            self.assertTrue(np.isfinite(result['final_nowcast']))
+        self.assertEqual(result['nonlinear_correction'], 0.0)
+        dfm = self.engine.dfm_model
+        expected = dfm.forecast(1)['mean'][0, dfm.columns.get_loc('electricity')]
+        self.assertAlmostEqual(result['final_nowcast'], float(expected))
+        print(f"✓ 现时预测: {result['final_nowcast']:.2f}")
+    
+    def test_repeated_predict_hits_residual_cache(self):
+        """测试重复预测请求复用残差预测缓存，重训练后失效"""
+        adapter = self.engine.tslm_adapter
+        self.engine.predict(horizon=2)
+        hits = adapter.cache_hits
+        self.engine.predict(horizon=2)
+        self.assertEqual(adapter.cache_hits, hits + 1)
+        
+        version = adapter.model_version
+        self.engine.retrain()
+        self.assertGreater(adapter.model_version, version)
+        self.assertEqual(adapter.cache_info()['size'], 0)
+        print(f"✓ 预测请求残差缓存: {adapter.cache_info()}")
+    
+    def test_predict_during_retrain(self):
+        """测试重训练期间并发预测始终使用完整拟合的模型"""
+        import threading
+        from unittest import mock
+        version = self.engine.model_version
+        errors = []
+        calls = 0
+        
+        # 拟合前暂停，放大“模型已创建但尚未拟合”的时间窗口
+        original_fit = MIDASModel.fit
+        def slow_fit(model, *args, **kwargs):
+            time.sleep(0.2)
+            return original_fit(model, *args, **kwargs)
+        
+        self.engine.predict(horizon=2)  # 预先构建TSLM模型
+        with mock.patch.object(MIDASModel, 'fit', slow_fit):
+            worker = threading.Thread(target=self.engine.retrain)
+            worker.start()
+            while worker.is_alive():
+                for kwargs in ({'use_hybrid': True}, {'use_hybrid': False}, {'target': 'electricity'}):
+                    try:
+                        self.engine.predict(horizon=2, **kwargs)
+                    except Exception as e:
+                        errors.append(e)
+                    calls += 1
+            worker.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self.engine.model_version, version + 1)
+        print(f"✓ 重训练期间并发预测: {calls}次无错误")
+    
+    def test_update_dfm_swaps_updated_model(self):
+        """测试新月度数据增量更新DFM：在副本上更新后锁内替换，超过上限时在副本上重新估计"""
+        engine = PredictionEngine()
+        engine.initialize(use_mock_data=True)
+        monthly = engine.processed_data['monthly']
+        columns = engine.dfm_model.columns
+        
+        def release(n):
+            last = engine.processed_data['monthly']
+            index = pd.date_range(last.index[-1], periods=n + 1, freq=last.index.freqstr or 'ME')[1:]
+            rows = pd.DataFrame(last[columns].iloc[-n:].values, index=index, columns=columns)
+            rows.iloc[-1, 0] = np.nan  # 末期部分指标尚未发布
+            return rows
+        
+        # 增量路径：原模型与原数据不变，新模型和新数据一起替换
+        engine.dfm_model.update_policy = DFMUpdatePolicy(max_new_rows=3, max_error_ratio=None)
+        old_model, version = engine.dfm_model, engine.model_version
+        old_factors = old_model.factors.copy()
+        n_periods = len(old_model.factors)
+        result = engine.update_dfm(release(2))
+        self.assertEqual(result, {'n_periods': n_periods + 2, 'rows_since_fit': 2, 'refit': False})
+        self.assertIsNot(engine.dfm_model, old_model)
+        self.assertEqual(len(old_model.factors), n_periods)
+        np.testing.assert_array_equal(old_model.factors, old_factors)
+        self.assertEqual(old_model.rows_since_fit, 0)
+        self.assertEqual(len(engine.processed_data['monthly']), len(monthly) + 2)
+        self.assertEqual(len(monthly), len(engine.data['monthly']))
+        self.assertEqual(engine.model_version, version + 1)
+        self.assertEqual(len(engine.predict('electricity', horizon=2)['final_prediction']), 2)
+        
+        # 重新估计路径：累计新增期数超过上限，副本在完整历史上重新拟合
+        refit_from = engine.dfm_model
+        result = engine.update_dfm(release(2))
+        self.assertEqual(result, {'n_periods': n_periods + 4, 'rows_since_fit': 0, 'refit': True})
+        self.assertEqual(len(refit_from.factors), n_periods + 2)
+        self.assertEqual(refit_from.rows_since_fit, 2)
+        self.assertEqual(len(engine.dfm_model.data), n_periods + 4)
+        self.assertEqual(engine.model_version, version + 2)
+        self.assertTrue(np.isfinite(engine.nowcast('electricity')['final_nowcast']))
+        
+        # 日期不晚于已有数据时拒绝更新
+        with self.assertRaises(ValueError):
+            engine.update_dfm(monthly.iloc[-1:][columns])
+        self.assertEqual(engine.model_version, version + 2)
+        print(f"✓ DFM增量更新: {n_periods}期 -> {result['n_periods']}期")
+    
+    def test_api_monthly_release(self):
+        """测试API月度数据发布接口增量更新DFM"""
+        from fastapi.testclient import TestClient
+        from backend.api.main import app, app_state
+        
+        with TestClient(app) as client:
+            engine = app_state["prediction_engine"]
+            last = engine.processed_data['monthly'].iloc[-1]
+            version = engine.model_version
+            date = (last.name + pd.offsets.MonthEnd(1)).strftime('%Y-%m-%d')
+            values = {'electricity': float(last['electricity']), 'pmi': None}
+            response = client.post('/api/v1/data/monthly', json=[{'date': date, 'values': values}])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['rows_since_fit'], 1)
+            self.assertEqual(engine.model_version, version + 1)
+            
+            response = client.post('/api/v1/data/monthly', json=[{'date': date, 'values': values}])
+            self.assertEqual(response.status_code, 400)
+        print(f"✓ API月度数据发布: {date}")
+    
+    def test_predict_batch_matches_single_predictions(self):
+        """测试批量预测与逐个预测结果一致，且残差只按最大预测期计算一次"""
+        from unittest import mock
+        adapter = self.engine.tslm_adapter
+        cache_size = adapter.config.forecast_cache_size
+        for kwargs in ({'use_hybrid': True}, {'use_hybrid': False}, {'target': 'electricity'}):
+            # 关闭残差缓存：合并的预测期只应触发一次TSLM预测
+            self.engine.predict_batch(horizons=[1], **kwargs)  # 预先完成TSLM误差回测
+            adapter.config.forecast_cache_size = 0
+            n_history = len(self.engine.prediction_history)
+            try:
+                with mock.patch.object(adapter, 'forecast', wraps=adapter.forecast) as forecast:
+                    batch = self.engine.predict_batch(horizons=[2, 4, 1, 4], **kwargs)
+            finally:
+                adapter.config.forecast_cache_size = cache_size
+            if kwargs.get('use_hybrid'):
+                self.assertEqual(forecast.call_count, 1)
+            self.assertIs(batch[1], batch[3])
+            self.assertEqual(len(self.engine.prediction_history), n_history + 4)
+            
+            for horizon, result in zip([2, 4, 1], batch):
+                single = self.engine.predict(horizon=horizon, **kwargs)
+                for name in ('linear_prediction', 'nonlinear_correction',
+                             'final_prediction', 'prediction_std'):
+                    np.testing.assert_allclose(np.atleast_1d(result[name]),
+                                               np.atleast_1d(single[name]), atol=1e-10)
+                self.assertEqual(result['confidence_interval'], single['confidence_interval'])
+        print("✓ 批量预测与逐个预测一致")
+
+
+class TestInferenceExecutor(unittest.TestCase):
+    """测试有界推理执行器"""
+    
+    def test_event_loop_stays_responsive(self):
+        """测试阻塞计算在线程池中执行时事件循环仍能及时调度"""
+        import asyncio
+        executor = InferenceExecutor(max_workers=2, max_queue=0)
+        
+        async def scenario():
+            task = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = time.perf_counter() - start
+            await task
+            return lag
+        
+        lag = asyncio.run(scenario())
+        executor.shutdown()
+        self.assertLess(lag, 0.1)
+        print(f"✓ 事件循环延迟: {lag*1000:.1f}ms")
+    
+    def test_queue_depth_limit(self):
+        """测试排队任务超过上限时立即拒绝"""
+        import asyncio
+        executor = InferenceExecutor(max_workers=1, max_queue=1)
+        
+        async def scenario():
+            return await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(3)),
+                                        return_exceptions=True)
+        
+        results = asyncio.run(scenario())
+        executor.shutdown()
+        rejected = [r for r in results if isinstance(r, ExecutorOverloadedError)]
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(executor.stats()['rejected'], 1)
+        self.assertEqual(executor.stats()['in_flight'], 0)
+        print(f"✓ 执行器排队上限: {executor.stats()}")
+    
+    def test_api_offloads_engine_calls(self):
+        """测试API预测请求经执行器完成"""
+        from fastapi.testclient import TestClient
+        from backend.api.main import app
+        
+        with TestClient(app) as client:
+            response = client.post('/api/v1/predict', json={'horizon': 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNotNone(response.json()['confidence_interval'])
+            stats = client.get('/api/v1/health').json()['inference']
+            self.assertGreaterEqual(stats['completed'], 1)
+        print(f"✓ API推理卸载: {stats}")
+
+
+class TestPredictionCoalescer(unittest.TestCase):
+    """测试预测请求合并器"""
+    
+    def _run(self, requests, coalescer):
+        import asyncio
+        
+        async def scenario():
+            return await asyncio.gather(*(coalescer.submit(*r) for r in requests),
+                                        return_exceptions=True)
+        return asyncio.run(scenario())
+    
+    def test_requests_are_grouped_and_deduplicated(self):
+        """测试同组请求合并为一次批量调用，相同预测期去重"""
+        calls = []
+        
+        async def batch_fn(target, horizons, use_hybrid):
+            calls.append((target, list(horizons), use_hybrid))
+            return [{'horizon': h, 'use_hybrid': use_hybrid} for h in horizons]
+        
+        coalescer = PredictionCoalescer(batch_fn, window_ms=5)
+        requests = [('gdp', h, True) for h in (1, 3, 3, 2, 1)] + [('gdp', 2, False)] * 3
+        results = self._run(requests, coalescer)
+        
+        self.assertEqual(sorted(calls), [('gdp', [1, 3, 3, 2, 1], True), ('gdp', [2, 2, 2], False)])
+        for (_, horizon, use_hybrid), result in zip(requests, results):
+            self.assertEqual(result, {'horizon': horizon, 'use_hybrid': use_hybrid})
+        stats = coalescer.stats()
+        self.assertEqual((stats['requests'], stats['batches'], stats['engine_horizons']), (8, 2, 4))
+        self.assertEqual(stats['pending'], 0)
+        print(f"✓ 预测请求合并: {stats}")
+    
+    def test_max_batch_and_errors(self):
+        """测试达到批次上限时立即提交，批量调用的异常传递给该批次所有请求"""
+        calls = []
+        
+        async def batch_fn(target, horizons, use_hybrid):
+            calls.append(len(horizons))
+            if target == 'bad':
+                raise RuntimeError("引擎错误")
+            return [{'horizon': h} for h in horizons]
+        
+        # 窗口足够长，只有批次上限能触发提交
+        coalescer = PredictionCoalescer(batch_fn, window_ms=60000, max_batch=2)
+        results = self._run([('gdp', 1, True), ('gdp', 2, True),
+                             ('bad', 1, True), ('bad', 1, True)], coalescer)
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(results[:2], [{'horizon': 1}, {'horizon': 2}])
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results[2:]))
+        
+        with self.assertRaises(ValueError):
+            PredictionCoalescer(batch_fn, max_batch=0)
+        print("✓ 合并批次上限与异常传递")
+    
+    def test_api_predict_goes_through_coalescer(self):
+        """测试API预测请求经合并器执行"""
+        from fastapi.testclient import TestClient
+        from backend.api.main import app
+        
+        with TestClient(app) as client:
+            for horizon in (1, 3):
+                response = client.post('/api/v1/predict', json={'horizon': horizon})
+                self.assertEqual(response.status_code, 200)
+            stats = client.get('/api/v1/health').json()['predict_coalescing']
+            self.assertGreaterEqual(stats['batches'], 2)
+            self.assertEqual(stats['pending'], 0)
+        print(f"✓ API预测请求合并: {stats}")
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试版本化响应缓存"""
+    
+    def test_keys_etags_and_eviction(self):
+        """测试缓存键、ETag匹配与LRU淘汰"""
+        cache = ResponseCache(max_entries=2)
+        key = cache.make_key('/a', [('y', '2'), ('x', '1')], 1)
+        self.assertEqual(key, cache.make_key('/a', [('x', '1'), ('y', '2')], 1))
+        self.assertNotEqual(key, cache.make_key('/a', [('x', '1'), ('y', '2')], 2))
+        
+        self.assertIsNone(cache.get(key))
+        entry = cache.put(key, b'{"v":1}')
+        self.assertIs(cache.get(key), entry)
+        self.assertEqual(entry.etag, cache.put(('/b', (), 1), b'{"v":1}').etag)
+        
+        for header in (entry.etag, 'W/' + entry.etag, '"other", ' + entry.etag, '*'):
+            self.assertTrue(cache.etag_matches(header, entry.etag))
+        for header in (None, '', '"other"'):
+            self.assertFalse(cache.etag_matches(header, entry.etag))
+        
+        # 容量为2时最久未使用的/b被淘汰
+        cache.get(key)
+        cache.put(('/c', (), 1), b'{}')
+        self.assertIsNone(cache.get(('/b', (), 1)))
+        self.assertIsNotNone(cache.get(key))
+        print(f"✓ 响应缓存: {cache.stats()}")
+    
+    def test_api_etag_and_version_invalidation(self):
+        """测试只读接口返回ETag、If-None-Match命中返回304、版本变化后重新计算"""
+        from fastapi.testclient import TestClient
+        from backend.api.main import app, app_state
+        
+        with TestClient(app) as client:
+            for url in ('/api/v1/data/gdp', '/api/v1/data/monthly', '/api/v1/analysis/factors',
+                        '/api/v1/analysis/midas-weights', '/api/v1/model/status'):
+                first = client.get(url)
+                self.assertEqual(first.status_code, 200)
+                etag = first.headers['etag']
+                second = client.get(url, headers={'If-None-Match': etag})
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second.content, b'')
+                self.assertEqual(client.get(url).content, first.content)
+            
+            records = client.get('/api/v1/data/gdp', params={'start_date': '2020-01-01'}).json()
+            self.assertTrue(all(r['date'] >= '2020-01-01' for r in records))
+            self.assertIn('value', records[0])
+            
+            # 数据版本变化：重新计算，内容未变时ETag不变
+            cache = app_state["response_cache"]
+            gdp_etag = client.get('/api/v1/data/gdp').headers['etag']
+            misses = cache.misses
+            app_state["data_manager"].update_data()
+            response = client.get('/api/v1/data/gdp', headers={'If-None-Match': gdp_etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(cache.misses, misses + 1)
+            
+            # 重训练后模型状态改变，旧ETag不再匹配
+            engine = app_state["prediction_engine"]
+            status_etag = client.get('/api/v1/model/status').headers['etag']
+            version = engine.model_version
+            engine.retrain()
+            self.assertEqual(engine.model_version, version + 1)
+            response = client.get('/api/v1/model/status', headers={'If-None-Match': status_etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['etag'], status_etag)
+            stats = client.get('/api/v1/health').json()['response_cache']
+        print(f"✓ API响应缓存: {stats}")
+
+
+class TestColumnarFormats(unittest.TestCase):
+    """测试列式数据响应格式"""
+    
+    def setUp(self):
+        index = pd.date_range('2020-01-31', periods=4, freq='ME', name='date')
+        self.df = pd.DataFrame({
+            'value': [1.5, np.nan, 3.25, np.inf],
+            'count': [1, 2, 3, 4],
+            'province': ['A', 'B', None, 'D']
+        }, index=index)
+    
+    def test_negotiate(self):
+        """测试按Accept头与q值选择格式"""
+        self.assertIsNone(columnar.negotiate(None))
+        self.assertIsNone(columnar.negotiate('application/json'))
+        self.assertIsNone(columnar.negotiate('text/html'))
+        self.assertEqual(columnar.negotiate(columnar.NUMPY_NPZ), columnar.NUMPY_NPZ)
+        self.assertEqual(columnar.negotiate(
+            f'{columnar.NUMPY_NPZ};q=0.5, {columnar.COLUMNAR_JSON};q=0.9'), columnar.COLUMNAR_JSON)
+        self.assertIsNone(columnar.negotiate(f'{columnar.NUMPY_NPZ};q=0, */*'))
+        if not columnar.arrow_available():
+            self.assertEqual(columnar.negotiate(
+                f'{columnar.ARROW_STREAM}, {columnar.NUMPY_NPZ};q=0.1'), columnar.NUMPY_NPZ)
+            with self.assertRaises(columnar.UnsupportedFormatError):
+                columnar.negotiate(columnar.ARROW_STREAM)
+        print("✓ 响应格式协商")
+    
+    def test_columnar_json_and_npz(self):
+        """测试列式JSON与npz编码内容（NaN/inf记为空值，日期为YYYY-MM-DD）"""
+        import io
+        import json
+        decoded = json.loads(columnar.encode_columnar_json(self.df, {'value': 'v'}))
+        self.assertEqual(decoded['columns'], ['date', 'v', 'count', 'province'])
+        self.assertEqual(decoded['n_rows'], 4)
+        self.assertEqual(decoded['data']['date'][0], '2020-01-31')
+        self.assertEqual(decoded['data']['v'], [1.5, None, 3.25, None])
+        self.assertEqual(decoded['data']['count'], [1, 2, 3, 4])
+        self.assertEqual(decoded['data']['province'], ['A', 'B', None, 'D'])
+        
+        arrays = np.load(io.BytesIO(columnar.encode_npz(self.df)), allow_pickle=False)
+        self.assertEqual(arrays.files, ['date', 'value', 'count', 'province'])
+        np.testing.assert_array_equal(arrays['date'], self.df.index.values.astype('datetime64[D]'))
+        np.testing.assert_array_equal(arrays['value'], self.df['value'].to_numpy())
+        self.assertEqual(list(arrays['province']), ['A', 'B', '', 'D'])
+        print("✓ 列式JSON与npz编码")
+    
+    @unittest.skipUnless(columnar.arrow_available(), "pyarrow未安装")
+    def test_arrow_stream(self):
+        """测试Arrow IPC流编码"""
+        import pyarrow as pa
+        table = pa.ipc.open_stream(columnar.encode_arrow(self.df)).read_all()
+        self.assertEqual(table.column_names, ['date', 'value', 'count', 'province'])
+        self.assertEqual(table.column('value').null_count, 1)
+        print("✓ Arrow IPC流编码")
+    
+    def test_api_accept_header(self):
+        """测试数据接口按Accept头返回列式格式，内容与逐行JSON一致"""
+        import io
+        from fastapi.testclient import TestClient
+        from backend.api.main import app
+        
+        with TestClient(app) as client:
+            params = {'start_date': '2016-01-01'}
+            records = client.get('/api/v1/data/gdp', params=params).json()
+            response = client.get('/api/v1/data/gdp', params=params,
+                                  headers={'Accept': columnar.COLUMNAR_JSON})
+            self.assertEqual(response.headers['content-type'], columnar.COLUMNAR_JSON)
+            self.assertIn('Accept', response.headers['vary'])
+            data = response.json()['data']
+            self.assertEqual(data['date'], [r['date'] for r in records])
+            self.assertEqual(data['value'], [r['value'] for r in records])
+            self.assertEqual(data['yoy_growth'], [r['yoy_growth'] for r in records])
+            
+            json_etag = client.get('/api/v1/data/daily').headers['etag']
+            response = client.get('/api/v1/data/daily', headers={'Accept': columnar.NUMPY_NPZ})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['etag'], json_etag)
+            npz_size = len(response.content)
+            arrays = np.load(io.BytesIO(response.content), allow_pickle=False)
+            self.assertIn('stock_index', arrays.files)
+            
+            # 部分日期的筛选规则与逐行JSON一致
+            for url in ('/api/v1/data/gdp', '/api/v1/data/monthly', '/api/v1/data/daily'):
+                for query in ({'start_date': '2020-01-15', 'end_date': '2020-03'},
+                              {'start_date': '2019', 'end_date': '2020-06-30'}):
+                    rows = client.get(url, params=query).json()
+                    columns = client.get(url, params=query,
+                                         headers={'Accept': columnar.COLUMNAR_JSON}).json()
+                    self.assertEqual(columns['n_rows'], len(rows))
+                    self.assertEqual(columns['data']['date'], [r['date'] for r in rows])
+            
+            if not columnar.arrow_available():
+                response = client.get('/api/v1/data/monthly',
+                                      headers={'Accept': columnar.ARROW_STREAM})
+                self.assertEqual(response.status_code, 406)
+        print(f"✓ API列式格式: 日度npz {npz_size}字节")
+
+
 def run_tests():
     """运行所有测试"""
     print("="*60)
@@ -297,9 +1417,19 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestDataGenerator))
     suite.addTests(loader.loadTestsFromTestCase(TestDataProcessor))
     suite.addTests(loader.loadTestsFromTestCase(TestMIDASModel))
+    suite.addTests(loader.loadTestsFromTestCase(TestMIDASAggregation))
+    suite.addTests(loader.loadTestsFromTestCase(TestMIDASGradient))
+    suite.addTests(loader.loadTestsFromTestCase(TestMIDASEnsemble))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchMIDASModel))
     suite.addTests(loader.loadTestsFromTestCase(TestDFMModel))
+    suite.addTests(loader.loadTestsFromTestCase(TestKalmanFilterDFM))
     suite.addTests(loader.loadTestsFromTestCase(TestTSLMAdapter))
     suite.addTests(loader.loadTestsFromTestCase(TestHybridModel))
+    suite.addTests(loader.loadTestsFromTestCase(TestPredictionEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestInferenceExecutor))
+    suite.addTests(loader.loadTestsFromTestCase(TestPredictionCoalescer))
+    suite.addTests(loader.loadTestsFromTestCase(TestResponseCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestColumnarFormats))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)